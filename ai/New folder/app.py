@@ -1,12 +1,16 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import json
+import numpy as np
 import pandas as pd
 from collections import Counter
 import os
 import random
 from datetime import datetime # Import datetime for current day
 
+from item_scoring import ItemScorer, WEIGHTINGS
+import order_store
+
 app = Flask(__name__)
 CORS(app)
 
@@ -14,12 +18,20 @@ CORS(app)
 MENU_ITEMS_FILE = "Mess.menuitems.json"
 TIMES_FILE = "Mess.times.json"
 STUDENT_ORDERS_FILE = "student_orders.json"
+# Columnar store (see order_store.py); used instead of STUDENT_ORDERS_FILE when it exists.
+# Create it with: python order_store.py convert student_orders.json
+ORDER_STORE_DIR = order_store.ORDER_STORE_DIR
 
 # Global variables to store loaded data
 df_menu_items = None
 df_times = None
 df_student_orders = None
 all_available_food_items = set() # To store all unique food items from the menu
+order_partitions = None # "YYYY-MM" partition keys when orders come from the columnar store, else None
+
+# Per-student index, built once by build_student_index()
+student_offsets = {} # student_id -> (start, stop) row range in df_student_orders (sorted by student)
+item_scorer = None # ItemScorer: per-(student, food item) order counts and ratings for all students
 
 def load_all_data():
     """
@@ -28,7 +40,7 @@ def load_all_data():
     """
     print("--- load_all_data() function started ---")
 
-    global df_menu_items, df_times, df_student_orders, all_available_food_items
+    global df_menu_items, df_times, df_student_orders, all_available_food_items, order_partitions
 
     print("Loading data for Flask server...")
     data = {}
@@ -56,7 +68,13 @@ def load_all_data():
         exit()
 
     # Load Student Orders (with ratings)
-    if os.path.exists(STUDENT_ORDERS_FILE):
+    if order_store.partitions(ORDER_STORE_DIR):
+        # Arrow files: categorical text columns and int8 ratings instead of one Python
+        # dict per order
+        df_student_orders = order_store.load_orders(ORDER_STORE_DIR)
+        order_partitions = list(df_student_orders['month'].cat.categories)
+        print(f"Loaded {ORDER_STORE_DIR} ({len(order_partitions)} monthly partitions)")
+    elif os.path.exists(STUDENT_ORDERS_FILE):
         with open(STUDENT_ORDERS_FILE, 'r', encoding='utf-8') as f:
             student_orders_data = json.load(f)
         df_student_orders = pd.DataFrame(student_orders_data)
@@ -75,6 +93,37 @@ def load_all_data():
                 all_available_food_items.update([item.strip() for item in item_group.split(',')])
     print(f"Found {len(all_available_food_items)} unique food items in the menu.")
 
+    build_student_index()
+
+def build_student_index():
+    """
+    Sorts the orders by student and precomputes, per student:
+      - the (start, stop) row range of their orders, so one student's history is a slice
+        instead of a boolean mask over the whole table
+      - their per-food-item order count and rating totals (ItemScorer), so /recommend and
+        /check_favorite_meal_availability score items without looping over rows
+    """
+    global df_student_orders, student_offsets, item_scorer
+
+    # Stable sort keeps each student's orders in their original file order
+    df_student_orders = df_student_orders.sort_values('student_id', kind='mergesort').reset_index(drop=True)
+
+    # Each student's block starts where the ID changes (categorical IDs sort by code, not
+    # alphabetically, so the block boundaries are found directly rather than with np.unique)
+    ids = df_student_orders['student_id'].to_numpy()
+    change = np.flatnonzero(ids[1:] != ids[:-1]) + 1
+    starts = np.concatenate(([0], change)) if len(ids) else change
+    stops = np.append(starts[1:], len(ids))
+    student_offsets = {ids[start]: (int(start), int(stop)) for start, stop in zip(starts, stops)}
+
+    item_scorer = ItemScorer(df_student_orders)
+    print(f"Indexed orders for {len(student_offsets)} students and {len(item_scorer.items)} food items.")
+
+def student_orders(student_id):
+    """Returns the student's rows of df_student_orders (empty if the ID is unknown)."""
+    start, stop = student_offsets.get(student_id, (0, 0))
+    return df_student_orders.iloc[start:stop]
+
 # --- API Endpoint for Recommendations ---
 @app.route('/recommend', methods=['POST'])
 def get_recommendations():
@@ -89,37 +138,13 @@ def get_recommendations():
 
     student_id = student_id.upper()
 
-    if student_id not in df_student_orders['student_id'].unique():
+    if student_id not in student_offsets:
         return jsonify({"error": f"Student ID '{student_id}' not found in order history."}), 404
 
-    student_specific_orders = df_student_orders[df_student_orders['student_id'] == student_id]
-
-    item_data = {}
-    for _, row in student_specific_orders.iterrows():
-        food_items_str = row['food_item']
-        rating = row['rating']
-        individual_items = [item.strip() for item in food_items_str.split(',')]
-
-        for item in individual_items:
-            if item not in item_data:
-                item_data[item] = {'count': 0, 'total_rating': 0, 'avg_rating': 0.0}
-            item_data[item]['count'] += 1
-            item_data[item]['total_rating'] += rating
-            item_data[item]['avg_rating'] = item_data[item]['total_rating'] / item_data[item]['count']
-
-    recommendations_with_scores = []
-    default_rating = 3.0
-
-    for food_item in all_available_food_items:
-        purchase_count = item_data.get(food_item, {}).get('count', 0)
-        average_rating = item_data.get(food_item, {}).get('avg_rating', default_rating)
-
-        score = (purchase_count * 0.6) + (average_rating * 0.4)
-        recommendations_with_scores.append({"food_item": food_item, "score": score})
-
-    recommendations_with_scores.sort(key=lambda x: x["score"], reverse=True)
-
-    top_n_recommendations = recommendations_with_scores[:3]
+    # Every menu item is a candidate; items the student never ordered get the default rating
+    top_n_recommendations = item_scorer.score(
+        [student_id], candidates=all_available_food_items, default_rating=3.0, top_n=3, **WEIGHTINGS["recommend"]
+    )[0]
 
     formatted_recommendations = [
         {"food_item": rec["food_item"], "predicted_rating": rec["score"]}
@@ -128,6 +153,69 @@ def get_recommendations():
 
     return jsonify({"student_id": student_id, "recommendations": formatted_recommendations})
 
+# --- API Endpoint for Scoring Many Students at Once ---
+@app.route('/recommend/batch', methods=['POST'])
+def get_batch_recommendations():
+    """
+    Body: {"student_ids": ["S001", ...], "weighting": "recommend" | "favorite", "top_n": 3}
+    Instead of a named weighting, custom weights can be given as {"weights": {"count": 0.5, "rating": 0.5}}.
+    "candidates" picks what is ranked: "menu" (every menu item) or "ordered" (only items the
+    student has ordered); it defaults to "menu" for recommend and "ordered" for favorite.
+    """
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    req_data = request.get_json()
+    student_ids = req_data.get('student_ids')
+    if not isinstance(student_ids, list) or not student_ids:
+        return jsonify({"error": "student_ids must be a non-empty list"}), 400
+
+    weighting = req_data.get('weighting', 'recommend')
+    if 'weights' in req_data:
+        try:
+            weights = {
+                "count_weight": float(req_data['weights']['count']),
+                "rating_weight": float(req_data['weights']['rating']),
+            }
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"error": "weights must be {\"count\": number, \"rating\": number}"}), 400
+    elif weighting in WEIGHTINGS:
+        weights = WEIGHTINGS[weighting]
+    else:
+        return jsonify({"error": f"weighting must be one of {sorted(WEIGHTINGS)}"}), 400
+
+    candidates = req_data.get('candidates', 'ordered' if weighting == 'favorite' else 'menu')
+    if candidates not in ('menu', 'ordered'):
+        return jsonify({"error": "candidates must be 'menu' or 'ordered'"}), 400
+
+    try:
+        top_n = int(req_data.get('top_n', 3))
+    except (TypeError, ValueError):
+        return jsonify({"error": "top_n must be a number"}), 400
+    if top_n < 1:
+        return jsonify({"error": "top_n must be at least 1"}), 400
+
+    student_ids = list(dict.fromkeys(str(sid).upper() for sid in student_ids))
+    found = [sid for sid in student_ids if sid in item_scorer]
+    not_found = [sid for sid in student_ids if sid not in item_scorer]
+
+    scored = item_scorer.score(
+        found,
+        candidates=all_available_food_items if candidates == 'menu' else None,
+        default_rating=3.0,
+        top_n=top_n,
+        **weights,
+    ) if found else []
+
+    results = [
+        {
+            "student_id": sid,
+            "recommendations": [{"food_item": r["food_item"], "predicted_rating": r["score"]} for r in recs],
+        }
+        for sid, recs in zip(found, scored)
+    ]
+    return jsonify({"results": results, "not_found": not_found})
+
 # --- API Endpoint for Analysis ---
 @app.route('/analyze/<student_id>', methods=['GET'])
 def analyze_student_api(student_id):
@@ -137,27 +225,41 @@ def analyze_student_api(student_id):
 
     print(f"DEBUG: Analyze request for student_id: {student_id}, month: {month_param}, year: {year_param}")
 
-    student_history = df_student_orders[df_student_orders['student_id'] == student_id].copy()
+    student_history = student_orders(student_id).copy()
     print(f"DEBUG: Initial student_history count for {student_id}: {len(student_history)}")
 
     if student_history.empty:
         return jsonify({"error": f"Student ID '{student_id}' not found in the order history."}), 404
 
+    month_num = year_num = None
     if month_param:
         try:
             month_num = int(month_param)
-            student_history = student_history[student_history['date'].dt.month == month_num]
-            print(f"DEBUG: After month filter ({month_num}), student_history count: {len(student_history)}")
         except ValueError:
             return jsonify({"error": "Invalid month parameter. Must be a number."}), 400
     if year_param:
         try:
             year_num = int(year_param)
-            student_history = student_history[student_history['date'].dt.year == year_num]
-            print(f"DEBUG: After year filter ({year_num}), student_history count: {len(student_history)}")
         except ValueError:
             return jsonify({"error": "Invalid year parameter. Must be a number."}), 400
 
+    if order_partitions is not None:
+        # Columnar store: the filter picks whole monthly partitions, then keeps this student's
+        # rows from those partitions (a comparison on the small 'month' category codes)
+        if month_num is not None or year_num is not None:
+            keys = order_store.matching_months(order_partitions, month_num, year_num)
+            student_history = student_history[student_history['month'].isin(keys)]
+            print(f"DEBUG: After partition filter ({', '.join(keys) or 'none'}), student_history count: {len(student_history)}")
+        # Back to plain strings so groupby below only sees combinations that actually occur
+        student_history = student_history.astype({col: object for col in order_store.CATEGORICAL_COLUMNS})
+    else:
+        if month_num is not None:
+            student_history = student_history[student_history['date'].dt.month == month_num]
+            print(f"DEBUG: After month filter ({month_num}), student_history count: {len(student_history)}")
+        if year_num is not None:
+            student_history = student_history[student_history['date'].dt.year == year_num]
+            print(f"DEBUG: After year filter ({year_num}), student_history count: {len(student_history)}")
+
     if student_history.empty:
         return jsonify({"student_id": student_id, "message": f"No orders found for {student_id} in the specified period."}), 200
 
@@ -191,38 +293,18 @@ def check_favorite_meal_availability(student_id):
     # Get day from query parameter, or default to current day
     day_param = request.args.get('day', datetime.now().strftime('%A').lower())
 
-    if student_id not in df_student_orders['student_id'].unique():
+    if student_id not in student_offsets:
         return jsonify({"error": f"Student ID '{student_id}' not found."}), 404
 
     # 1. Determine student's favorite meals (top 3 highest-rated from their history)
-    student_specific_orders = df_student_orders[df_student_orders['student_id'] == student_id].copy()
-    
     # If no orders, no favorites
-    if student_specific_orders.empty:
+    if student_id not in item_scorer:
         return jsonify({"student_id": student_id, "message": "No order history to determine favorites."}), 200
 
-    item_data = {}
-    for _, row in student_specific_orders.iterrows():
-        food_items_str = row['food_item']
-        rating = row['rating']
-        individual_items = [item.strip() for item in food_items_str.split(',')]
-
-        for item in individual_items:
-            if item not in item_data:
-                item_data[item] = {'count': 0, 'total_rating': 0, 'avg_rating': 0.0}
-            item_data[item]['count'] += 1
-            item_data[item]['total_rating'] += rating
-            item_data[item]['avg_rating'] = item_data[item]['total_rating'] / item_data[item]['count']
-
-    favorite_candidates = []
-    for item, data in item_data.items():
-        # Use a simplified score for favorites: prioritize high rating and then count
-        # This is slightly different from the recommendation score, focusing on past enjoyment
-        favorite_score = data['avg_rating'] * 0.7 + data['count'] * 0.3 # Higher weight on rating for 'favorite'
-        favorite_candidates.append({"food_item": item, "score": favorite_score})
-    
-    favorite_candidates.sort(key=lambda x: x["score"], reverse=True)
-    top_favorite_items = [item['food_item'] for item in favorite_candidates[:3]] # Top 3 favorites
+    # Favorites use a different weighting than recommendations: higher weight on rating,
+    # focusing on past enjoyment. Top 3 favorites among the items the student has ordered.
+    favorite_candidates = item_scorer.score([student_id], top_n=3, **WEIGHTINGS["favorite"])[0]
+    top_favorite_items = [item['food_item'] for item in favorite_candidates]
 
     # 2. Get today's menu
     today_menu_row = df_menu_items[df_menu_items['day'] == day_param].iloc[0] if not df_menu_items[df_menu_items['day'] == day_param].empty else None
@@ -1,32 +1,181 @@
+import argparse
 import json
-import pandas as pd
-import random
-from datetime import date, timedelta
 import os # Import os module for path handling
+from datetime import date
+
+import numpy as np
+import pandas as pd
 
 # --- Configuration ---
 NUM_STUDENTS = 60
 START_DATE = date(2025, 7, 1)
 DAYS_TO_GENERATE = 30 # Generate orders for 30 days
-ORDERS_PER_STUDENT_PER_DAY_RANGE = (0, 3) # Each student orders 0 to 3 meals per day
+MAX_ORDERS_PER_DAY = 3 # Each student orders 0 to 3 meals per day
 RATING_RANGE = (1, 5) # Ratings from 1 to 5
+SEED = 42 # Same seed + same settings = same file
+
+# Realism knobs (the defaults reproduce the old behaviour: every meal equally likely, uniform ratings)
+# PREFERENCE_SKEW: how strongly each student prefers some meals over others. Every student gets a
+#   random "taste" score per menu slot (weekday x meal type), drawn with this standard deviation.
+#   Higher taste = picked more often and rated higher. 0 = no preferences; 1 is already quite picky.
+PREFERENCE_SKEW = 0.0
+# WEEKDAY_WEIGHTS: how busy each weekday is, Monday..Sunday, relative to an average day.
+#   e.g. (1.1, 1.1, 1.1, 1.1, 1.0, 0.8, 0.8) for quieter weekends.
+WEEKDAY_WEIGHTS = (1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0)
+STUDENTS_PER_CHUNK = 1000 # Students generated (and held in memory) at a time
+
+MEAL_TYPES = ['breakfast', 'lunch', 'dinner']
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+OUTPUT_FORMATS = ['json', 'jsonl', 'parquet']
 
 # --- Define file paths relative to the script's location ---
 SCRIPT_DIR = os.path.dirname(__file__) # Get the directory where this script is located
 MENU_ITEMS_FILE = os.path.join(SCRIPT_DIR, "Mess.menuitems.json")
 STUDENT_ORDERS_OUTPUT_FILE = os.path.join(SCRIPT_DIR, "student_orders.json")
 
-def generate_student_orders():
+
+def load_weekly_menu(menu_file=MENU_ITEMS_FILE):
+    """
+    Reads the menu into a 7 x 3 table: weekly_menu[weekday][meal] is the food_item string
+    (e.g. "Poha, Tea"), or None when that meal isn't served. Weekday 0 is Monday.
+    """
+    with open(menu_file, 'r', encoding='utf-8') as f: # Specify encoding
+        df_menu = pd.DataFrame(json.load(f))
+
+    weekly_menu = np.full((len(WEEKDAYS), len(MEAL_TYPES)), None, dtype=object)
+    for _, row in df_menu.iterrows():
+        if row.get('day') not in WEEKDAYS:
+            continue
+        for m, meal_type in enumerate(MEAL_TYPES):
+            if pd.notna(row.get(meal_type)):
+                weekly_menu[WEEKDAYS.index(row['day']), m] = row[meal_type]
+    return weekly_menu
+
+
+def order_chunks(weekly_menu, num_students=NUM_STUDENTS, start_date=START_DATE, days=DAYS_TO_GENERATE,
+                 seed=SEED, preference_skew=PREFERENCE_SKEW, weekday_weights=WEEKDAY_WEIGHTS,
+                 students_per_chunk=STUDENTS_PER_CHUNK):
+    """
+    Generates orders for a block of students at a time, as whole NumPy arrays of shape
+    (students, days, meals) instead of a Python loop per student per day.
+
+    For every student and day:
+      - how many meals they order is Binomial(MAX_ORDERS_PER_DAY, p), with p scaled by the
+        weekday weight (capped at the number of meals served that day)
+      - which meals is a weighted draw without replacement, weighted by the student's taste
+      - the rating is 1..5, shifted up or down by the student's taste for that meal
+
+    Yields:
+        pd.DataFrame: One chunk of orders, same columns as student_orders.json, in student
+        then date order.
+    """
+    rng = np.random.default_rng(seed)
+    served = np.array([[item is not None for item in meals] for meals in weekly_menu]) # (7, 3)
+
+    dates = np.datetime64(start_date, 'D') + np.arange(days)
+    weekday = (dates.astype('int64') - 4) % 7 # 1970-01-01 was a Thursday; 0 = Monday
+    date_strings = np.datetime_as_string(dates)
+    meals_served = served[weekday] # (days, 3)
+
+    # Output columns are categoricals (small integer codes), so a chunk costs a few bytes per order
+    food_names = sorted({item for item in weekly_menu.ravel() if item is not None})
+    food_codes = np.array([[food_names.index(item) if item is not None else -1 for item in meals]
+                           for meals in weekly_menu])[weekday] # (days, 3)
+
+    # Average MAX_ORDERS_PER_DAY / 2 meals per day on a weight-1.0 weekday, like the old uniform 0..3
+    order_rate = np.clip(0.5 * np.asarray(weekday_weights, dtype=float)[weekday], 0.0, 1.0) # (days,)
+
+    for first in range(0, num_students, students_per_chunk):
+        n = min(students_per_chunk, num_students - first)
+
+        # Taste per student per menu slot (weekday x meal), looked up for every date
+        taste = rng.normal(0.0, preference_skew, size=(n, len(WEEKDAYS), len(MEAL_TYPES)))[:, weekday, :] # (n, days, 3)
+
+        wanted = rng.binomial(MAX_ORDERS_PER_DAY, np.broadcast_to(order_rate, (n, days)))
+        wanted = np.minimum(wanted, meals_served.sum(axis=1)) # (n, days)
+
+        # Weighted sampling without replacement: each served meal gets a random key Exp(1) / weight
+        # and the `wanted` smallest keys are the meals ordered that day
+        keys = rng.exponential(size=(n, days, len(MEAL_TYPES))) / np.exp(taste)
+        keys = np.where(meals_served, keys, np.inf)
+        rank = keys.argsort(axis=-1).argsort(axis=-1)
+        ordered = rank < wanted[..., None] # (n, days, 3)
+
+        # Uniform on 1..5 when taste is 0; liked meals drift towards 5, disliked towards 1
+        ratings = np.rint(3 + taste + rng.uniform(-2.5, 2.5, size=taste.shape))
+        ratings = np.clip(ratings, RATING_RANGE[0], RATING_RANGE[1]).astype(np.int8)
+
+        s, d, m = np.nonzero(ordered)
+        student_ids = [f"S{i:03d}" for i in range(first + 1, first + n + 1)]
+        yield pd.DataFrame({
+            "student_id": pd.Categorical.from_codes(s, student_ids),
+            "date": pd.Categorical.from_codes(d, date_strings),
+            "day": pd.Categorical.from_codes(weekday[d], WEEKDAYS),
+            "meal_type": pd.Categorical.from_codes(m, MEAL_TYPES),
+            "food_item": pd.Categorical.from_codes(food_codes[d, m], food_names),
+            "rating": ratings[s, d, m],
+        })
+
+
+def write_orders(chunks, output_file, output_format='json'):
     """
-    Generates mock student order data with ratings for NUM_STUDENTS.
+    Writes the chunks one at a time, so memory stays at one chunk however large the output is.
+
+    Formats:
+        json: a JSON array, the format app.py and meal_recommender_ai.py read
+        jsonl: one order per line
+        parquet: one row group per chunk (needs pyarrow)
+
+    Returns:
+        int: Number of orders written.
     """
-    print(f"Starting data generation for {NUM_STUDENTS} students...")
+    total = 0
+    if output_format == 'parquet':
+        import pyarrow as pa # Only needed for Parquet output
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_file, table.schema)
+                writer.write_table(table)
+                total += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return total
+
+    with open(output_file, 'w', encoding='utf-8') as f: # Specify encoding
+        if output_format == 'json':
+            f.write("[\n")
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            lines = chunk.to_json(orient='records', lines=True).rstrip("\n")
+            if output_format == 'json':
+                lines = (",\n" if total else "") + lines.replace("\n", ",\n")
+            f.write(lines)
+            if output_format == 'jsonl':
+                f.write("\n")
+            total += len(chunk)
+        if output_format == 'json':
+            f.write("\n]\n")
+    return total
+
+
+def generate_student_orders(num_students=NUM_STUDENTS, start_date=START_DATE, days=DAYS_TO_GENERATE,
+                            output_file=STUDENT_ORDERS_OUTPUT_FILE, output_format='json', seed=SEED,
+                            preference_skew=PREFERENCE_SKEW, weekday_weights=WEEKDAY_WEIGHTS):
+    """
+    Generates mock student order data with ratings for num_students and writes it to output_file.
+    """
+    print(f"Starting data generation for {num_students} students x {days} days...")
 
     # Load menu items to ensure consistency
     try:
-        with open(MENU_ITEMS_FILE, 'r', encoding='utf-8') as f: # Specify encoding
-            menu_data = json.load(f)
-        df_menu = pd.DataFrame(menu_data)
+        weekly_menu = load_weekly_menu(MENU_ITEMS_FILE)
         print(f"Successfully loaded menu items from: {MENU_ITEMS_FILE}")
     except FileNotFoundError:
         print(f"ERROR: Menu items file not found at: {MENU_ITEMS_FILE}. Please ensure it exists in the same directory as the script.")
@@ -34,63 +183,37 @@ def generate_student_orders():
     except json.JSONDecodeError as e:
         print(f"ERROR: Could not decode JSON from {MENU_ITEMS_FILE}. Check file content for syntax errors. Error: {e}")
         return
-    except Exception as e:
-        print(f"An unexpected error occurred while loading menu items: {e}")
-        return
 
-    # Prepare a list of all possible food items from the menu
-    all_menu_food_items = []
-    for _, row in df_menu.iterrows():
-        for meal_type in ['breakfast', 'lunch', 'dinner']:
-            if pd.notna(row[meal_type]):
-                # Split combined food items like "Poha, Tea" into individual components
-                individual_items = [item.strip() for item in row[meal_type].split(',')]
-                all_menu_food_items.extend(individual_items)
-    all_menu_food_items = list(set(all_menu_food_items)) # Get unique items
-    print(f"Found {len(all_menu_food_items)} unique food items in the menu.")
-
-    mock_orders = []
-    student_ids = [f"S{i:03d}" for i in range(1, NUM_STUDENTS + 1)]
-
-    for student_id in student_ids:
-        current_date = START_DATE
-        for _ in range(DAYS_TO_GENERATE):
-            num_orders_today = random.randint(ORDERS_PER_STUDENT_PER_DAY_RANGE[0], ORDERS_PER_STUDENT_PER_DAY_RANGE[1])
-            
-            day_of_week = current_date.strftime('%A').lower()
-            daily_menu = df_menu[df_menu['day'] == day_of_week]
-
-            if not daily_menu.empty:
-                daily_menu_row = daily_menu.iloc[0]
-                available_meals_today = []
-                if pd.notna(daily_menu_row.get('breakfast')): available_meals_today.append({'type': 'breakfast', 'items': daily_menu_row['breakfast']})
-                if pd.notna(daily_menu_row.get('lunch')): available_meals_today.append({'type': 'lunch', 'items': daily_menu_row['lunch']})
-                if pd.notna(daily_menu_row.get('dinner')): available_meals_today.append({'type': 'dinner', 'items': daily_menu_row['dinner']})
-                
-                num_orders_today = min(num_orders_today, len(available_meals_today))
-
-                if num_orders_today > 0:
-                    chosen_meals = random.sample(available_meals_today, num_orders_today)
-
-                    for meal in chosen_meals:
-                        mock_orders.append({
-                            "student_id": student_id,
-                            "date": current_date.strftime('%Y-%m-%d'),
-                            "day": day_of_week,
-                            "meal_type": meal['type'],
-                            "food_item": meal['items'],
-                            "rating": random.randint(RATING_RANGE[0], RATING_RANGE[1])
-                        })
-            current_date += timedelta(days=1)
-
-    # Save the generated data to JSON
+    chunks = order_chunks(weekly_menu, num_students, start_date, days, seed, preference_skew, weekday_weights)
+
+    # Save the generated data, chunk by chunk
     try:
-        with open(STUDENT_ORDERS_OUTPUT_FILE, 'w', encoding='utf-8') as f: # Specify encoding
-            json.dump(mock_orders, f, indent=2)
-        print(f"Generated {len(mock_orders)} orders for {NUM_STUDENTS} students.")
-        print(f"Data successfully saved to: {STUDENT_ORDERS_OUTPUT_FILE}")
+        total = write_orders(chunks, output_file, output_format)
+        print(f"Generated {total} orders for {num_students} students.")
+        print(f"Data successfully saved to: {output_file}")
     except Exception as e:
         print(f"ERROR: An error occurred while saving student orders data: {e}")
 
+
 if __name__ == "__main__":
-    generate_student_orders()
+    # python generate_student_data.py                                  # 60 students x 30 days -> student_orders.json
+    # python generate_student_data.py --students 50000 --days 365 --format parquet --output orders.parquet
+    # python generate_student_data.py --skew 0.8 --weekday-weights 1.1,1.1,1.1,1.1,1,0.7,0.7
+    parser = argparse.ArgumentParser(description="Generate mock student orders")
+    parser.add_argument("--students", type=int, default=NUM_STUDENTS)
+    parser.add_argument("--days", type=int, default=DAYS_TO_GENERATE)
+    parser.add_argument("--start", type=date.fromisoformat, default=START_DATE, help="First date, YYYY-MM-DD")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default='json')
+    parser.add_argument("--output", default=STUDENT_ORDERS_OUTPUT_FILE)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--skew", type=float, default=PREFERENCE_SKEW, help="Per-student preference strength (0 = none)")
+    parser.add_argument("--weekday-weights", default=",".join(map(str, WEEKDAY_WEIGHTS)),
+                        help="Seven comma-separated weights, Monday..Sunday")
+    args = parser.parse_args()
+
+    weights = tuple(float(w) for w in args.weekday_weights.split(","))
+    if len(weights) != len(WEEKDAYS):
+        parser.error("--weekday-weights needs exactly 7 values (Monday..Sunday)")
+
+    generate_student_orders(args.students, args.start, args.days, args.output, args.format,
+                            args.seed, args.skew, weights)
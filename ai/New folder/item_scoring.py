@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+# Named weightings for ItemScorer.score(); add new ones here
+WEIGHTINGS = {
+    # /recommend: how often the student ordered an item matters most
+    "recommend": {"count_weight": 0.6, "rating_weight": 0.4},
+    # favorite detection: past enjoyment (rating) matters most
+    "favorite": {"count_weight": 0.3, "rating_weight": 0.7},
+}
+
+
+def explode_items(df_orders):
+    """
+    Turns the order table into one row per (student, individual food item, rating).
+    A "Poha, Tea" order becomes two rows, one for Poha and one for Tea.
+    """
+    items = df_orders[['student_id', 'food_item', 'rating']].copy()
+    items['food_item'] = items['food_item'].str.split(',')
+    items = items.explode('food_item', ignore_index=True)
+    items['food_item'] = items['food_item'].str.strip()
+    return items
+
+
+class ItemScorer:
+    """
+    Order count and total rating for every (student, food item) pair, computed once for all
+    students with np.bincount over integer codes.
+
+    The tables are dense (students x distinct food items). The menu has a few dozen items,
+    so even thousands of students fit in a few MB. Scoring a batch of students is then a
+    handful of array operations.
+    """
+
+    def __init__(self, df_orders):
+        items = explode_items(df_orders)
+        student_codes, self.students = pd.factorize(items['student_id'])
+        item_codes, self.items = pd.factorize(items['food_item'])
+        self.student_row = {sid: k for k, sid in enumerate(self.students)}
+        self.item_col = {item: j for j, item in enumerate(self.items)}
+
+        shape = (len(self.students), len(self.items))
+        pair = student_codes * shape[1] + item_codes
+        size = shape[0] * shape[1]
+        self.counts = np.bincount(pair, minlength=size).reshape(shape)
+        self.totals = np.bincount(pair, weights=items['rating'].to_numpy(dtype=float), minlength=size).reshape(shape)
+
+        # Position where each student first ordered each item; used to break score ties the
+        # same way the old per-row loops did (first ordered, first listed)
+        first_seen = np.full(size, np.iinfo(np.int64).max)
+        unique_pairs, first_index = np.unique(pair, return_index=True)
+        first_seen[unique_pairs] = first_index
+        self.first_seen = first_seen.reshape(shape)
+
+    def __contains__(self, student_id):
+        return student_id in self.student_row
+
+    def score(self, student_ids, count_weight, rating_weight, candidates=None, default_rating=3.0, top_n=3):
+        """
+        Scores items for many students at once: count * count_weight + avg_rating * rating_weight.
+
+        Args:
+            student_ids (list): Students to score; all must be known (check with `in`).
+            count_weight (float), rating_weight (float): The weighting, e.g. WEIGHTINGS["recommend"].
+            candidates (list, optional): Items to rank for every student, including ones they never
+                ordered (count 0, rating `default_rating`). Defaults to each student's own items.
+            default_rating (float): Rating assumed for candidate items the student never ordered.
+            top_n (int): How many items to return per student.
+
+        Returns:
+            list: One list of {"food_item", "score"} per student, best first.
+        """
+        rows = [self.student_row[sid] for sid in student_ids]
+
+        if candidates is None:
+            names = self.items
+            counts = self.counts[rows]
+            totals = self.totals[rows]
+            tie_break = self.first_seen[rows]
+            seen = counts > 0
+            avg = np.divide(totals, counts, out=np.zeros_like(totals), where=seen)
+        else:
+            names = list(candidates)
+            cols = np.array([self.item_col.get(item, -1) for item in names], dtype=np.intp)
+            known = cols >= 0
+            counts = np.zeros((len(rows), len(names)), dtype=self.counts.dtype)
+            totals = np.zeros((len(rows), len(names)))
+            counts[:, known] = self.counts[np.ix_(rows, cols[known])]
+            totals[:, known] = self.totals[np.ix_(rows, cols[known])]
+            tie_break = np.broadcast_to(np.arange(len(names)), counts.shape)
+            seen = np.ones(counts.shape, dtype=bool)
+            avg = np.divide(totals, counts, out=np.full(totals.shape, float(default_rating)), where=counts > 0)
+
+        scores = counts * count_weight + avg * rating_weight
+        scores = np.where(seen, scores, -np.inf)
+
+        # Highest score first; ties keep the candidate (or first-ordered) order
+        order = np.lexsort((tie_break, -scores), axis=-1)[:, :top_n]
+        results = []
+        for i, cols in enumerate(order):
+            results.append([
+                {"food_item": names[j], "score": float(scores[i, j])}
+                for j in cols if np.isfinite(scores[i, j])
+            ])
+        return results
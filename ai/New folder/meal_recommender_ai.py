@@ -3,6 +3,7 @@ import pandas as pd # For powerful data handling (DataFrames)
 from collections import Counter # To easily count frequencies of items
 import os # To check if files exist
 import random # IMP
+import order_store # Columnar (Arrow) copy of student_orders.json, if one has been created
 # --- Step 1: Your Data (Now reading from files) ---
 # We will now read the JSON data directly from the files you created.
 # This is a more standard way to handle data in real projects.
@@ -42,7 +43,13 @@ def load_data_from_files():
         return None
 
     # Load Student Orders (the new data)
-    if os.path.exists(STUDENT_ORDERS_FILE):
+    # If the columnar store exists (python order_store.py convert), read that instead of the JSON
+    if order_store.partitions(order_store.ORDER_STORE_DIR):
+        df = order_store.load_orders(order_store.ORDER_STORE_DIR)
+        # The analysis below groups by day/meal_type, so use plain strings rather than categoricals
+        data['df_student_orders'] = df[order_store.COLUMNS].astype({col: object for col in order_store.CATEGORICAL_COLUMNS})
+        print(f"Loaded {order_store.ORDER_STORE_DIR}")
+    elif os.path.exists(STUDENT_ORDERS_FILE):
         with open(STUDENT_ORDERS_FILE, 'r') as f:
             student_orders_data = json.load(f)
         data['df_student_orders'] = pd.DataFrame(student_orders_data)
@@ -0,0 +1,174 @@
+import glob
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# pyarrow is imported inside the functions that read or write the store, so servers that only
+# use student_orders.json run without it installed
+
+# --- Columnar store for student orders ---
+# Instead of one big student_orders.json, orders live in Arrow IPC files partitioned by month:
+#
+#   student_orders_store/
+#     month=2025-07/part-00000.arrow
+#     month=2025-08/part-00000.arrow
+#     month=2025-08/part-00001.arrow   <- written by append_orders()
+#
+# Text columns (student_id, day, meal_type, food_item) are dictionary-encoded and load as
+# pandas categoricals and ratings are int8, so the loaded DataFrame holds small integer codes
+# instead of one Python string per cell. Loading still materializes that DataFrame in memory.
+# A month/year filter only opens the matching partitions.
+
+ORDER_STORE_DIR = "student_orders_store"
+CATEGORICAL_COLUMNS = ['student_id', 'day', 'meal_type', 'food_item']
+COLUMNS = ['student_id', 'date', 'day', 'meal_type', 'food_item', 'rating']
+
+
+def schema():
+    import pyarrow as pa
+    return pa.schema([
+        ('student_id', pa.dictionary(pa.int32(), pa.string())),
+        ('date', pa.timestamp('ms')),
+        ('day', pa.dictionary(pa.int8(), pa.string())),
+        ('meal_type', pa.dictionary(pa.int8(), pa.string())),
+        ('food_item', pa.dictionary(pa.int32(), pa.string())),
+        ('rating', pa.int8()),
+    ])
+
+
+def month_key(year, month):
+    return f"{year:04d}-{month:02d}"
+
+
+def partitions(store_dir=ORDER_STORE_DIR):
+    """
+    Lists the month partitions in the store.
+
+    Returns:
+        dict: {"2025-07": [file paths...], ...} in month order.
+    """
+    found = {}
+    for path in sorted(glob.glob(os.path.join(store_dir, "month=*", "*.arrow"))):
+        key = os.path.basename(os.path.dirname(path))[len("month="):]
+        found.setdefault(key, []).append(path)
+    return dict(sorted(found.items()))
+
+
+def matching_months(keys, month=None, year=None):
+    """Partition pruning: keeps only the "YYYY-MM" keys that match the month and/or year filter."""
+    return [
+        key for key in keys
+        if (year is None or int(key[:4]) == year) and (month is None or int(key[5:7]) == month)
+    ]
+
+
+def load_orders(store_dir=ORDER_STORE_DIR, month=None, year=None):
+    """
+    Reads the store into a DataFrame with the same columns as student_orders.json, plus a
+    categorical 'month' column holding each row's partition key.
+
+    Args:
+        store_dir (str): Directory of the store.
+        month (int, optional), year (int, optional): Only read partitions for this month/year.
+
+    Returns:
+        pd.DataFrame: One row per order; text columns are categoricals, rating is int8.
+    """
+    import pyarrow as pa
+
+    files = partitions(store_dir)
+    tables = []
+    for key in matching_months(files, month, year):
+        for path in files[key]:
+            # Mapping the file avoids an extra read buffer; the columns are copied into the
+            # DataFrame by to_pandas() below
+            with pa.memory_map(path, 'r') as source:
+                table = pa.ipc.open_file(source).read_all()
+            month_column = pa.DictionaryArray.from_arrays(pa.array(np.zeros(table.num_rows, dtype=np.int8)), [key])
+            tables.append(table.append_column('month', month_column))
+
+    if not tables:
+        df = pd.DataFrame({col: pd.Series(dtype=object) for col in COLUMNS + ['month']})
+        df['date'] = pd.to_datetime(df['date'])
+        return df
+
+    table = pa.concat_tables(tables).unify_dictionaries()
+    del tables
+    # self_destruct frees each Arrow column as soon as it is converted, so the table and the
+    # DataFrame are not both held in full; dates convert straight to datetime64[ns]
+    return table.to_pandas(self_destruct=True, split_blocks=True, coerce_temporal_nanoseconds=True)
+
+
+def _to_table(df):
+    import pyarrow as pa
+
+    df = df[COLUMNS].copy()
+    df['date'] = pd.to_datetime(df['date'])
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype(str)
+    df['rating'] = df['rating'].astype('int8')
+    return pa.Table.from_pandas(df, schema=schema(), preserve_index=False)
+
+
+def append_orders(orders, store_dir=ORDER_STORE_DIR):
+    """
+    Adds orders (a list of order dicts or a DataFrame) to the store. Each month touched gets a
+    new part file; existing files are never rewritten.
+
+    Returns:
+        int: Number of orders written.
+    """
+    import pyarrow as pa
+
+    df = pd.DataFrame(orders)
+    if df.empty:
+        return 0
+    df['date'] = pd.to_datetime(df['date'])
+
+    for (year, month), rows in df.groupby([df['date'].dt.year, df['date'].dt.month]):
+        part_dir = os.path.join(store_dir, f"month={month_key(year, month)}")
+        os.makedirs(part_dir, exist_ok=True)
+        part = len(glob.glob(os.path.join(part_dir, "part-*.arrow")))
+        path = os.path.join(part_dir, f"part-{part:05d}.arrow")
+
+        # Write to a temp file and rename, so a reader never sees a half-written part
+        tmp = path + ".tmp"
+        table = _to_table(rows)
+        with pa.OSFile(tmp, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp, path)
+
+    return len(df)
+
+
+def convert_json(json_path, store_dir=ORDER_STORE_DIR):
+    """One-off conversion of an existing student_orders.json into an empty columnar store."""
+    if partitions(store_dir):
+        raise ValueError(f"{store_dir} already has orders; use append for new days")
+    with open(json_path, 'r', encoding='utf-8') as f:
+        orders = json.load(f)
+    return append_orders(orders, store_dir)
+
+
+if __name__ == "__main__":
+    # python order_store.py convert [student_orders.json] [store_dir]
+    # python order_store.py append new_orders.json [store_dir]
+    if len(sys.argv) < 2 or sys.argv[1] not in ("convert", "append"):
+        print("Usage: python order_store.py convert [orders.json] [store_dir]")
+        print("       python order_store.py append new_orders.json [store_dir]")
+        sys.exit(1)
+
+    command = sys.argv[1]
+    source = sys.argv[2] if len(sys.argv) > 2 else "student_orders.json"
+    target = sys.argv[3] if len(sys.argv) > 3 else ORDER_STORE_DIR
+    if command == "convert":
+        written = convert_json(source, target)
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            written = append_orders(json.load(f), target)
+    print(f"{'Converted' if command == 'convert' else 'Appended'} {written} orders into {target}")
+    print(f"Partitions: {', '.join(partitions(target))}")
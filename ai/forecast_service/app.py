@@ -1,21 +1,135 @@
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
-from ingredient_forecast import forecast_ingredient_requirements, save_to_db
-from mess_assistant import get_recommendations
+import json
+import os
+import cf
+import indexes
+from jobs import JobQueue
+import mess_assistant
+from mess_assistant import get_recommendations, iter_batch_recommendations
+from mongo import db
+from snapshots import (
+    LEASE_SECONDS, RETRY_AFTER, get_snapshot, latest_snapshot, refresh_snapshot, snapshot_meta, start_refresher,
+    training_lease, trigger_refresh,
+)
 
-app = Flask(__name__)
-CORS(app)
+bp = Blueprint("forecast", __name__)
 
-@app.route('/forecast/weekly')
+# Model training runs on the job queue's own threads, never on a request thread.
+# Job state is mirrored to Mongo so any WSGI worker can answer a poll.
+jobs = JobQueue(store=lambda: db.forecast_jobs)
+
+# Forecasting modules pull in pandas and Prophet; they load on the first job that needs them.
+# Training jobs queue on the shared Mongo lease, so one process trains at a time across workers.
+def run_weekly_job(weeks=1):
+    from forecast import get_forecast
+    with training_lease(wait=LEASE_SECONDS):
+        return get_forecast(horizon_weeks=weeks)
+
+def run_ingredients_job():
+    from ingredient_forecast import build_ingredient_forecast, save_to_db
+    with training_lease(wait=LEASE_SECONDS):
+        usage, fingerprint = build_ingredient_forecast()
+    save_to_db(usage, fingerprint=fingerprint)
+    return usage
+
+def run_refresh_job():
+    return snapshot_meta(refresh_snapshot(wait=LEASE_SECONDS))
+
+def run_recommender_job():
+    with training_lease("recommender-rebuild", wait=LEASE_SECONDS):
+        return cf.rebuild()
+
+JOB_KINDS = {
+    "weekly": run_weekly_job,
+    "ingredients": run_ingredients_job,
+    "refresh": run_refresh_job,
+    "recommender": run_recommender_job,
+}
+
+def snapshot_response(payload, doc):
+    # Same body as before; staleness metadata travels in headers
+    resp = jsonify(payload)
+    meta = snapshot_meta(doc)
+    resp.headers["X-Forecast-Generated-At"] = meta["generatedAt"]
+    resp.headers["X-Forecast-Age-Seconds"] = str(meta["ageSeconds"])
+    resp.headers["X-Forecast-Stale"] = "true" if meta["stale"] else "false"
+    return resp
+
+def snapshot_pending():
+    # No snapshot yet: a background refresh is training it, ask the client to come back
+    resp = jsonify({"error": "Forecast is being generated, retry shortly", **snapshot_meta(None)})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = str(RETRY_AFTER)
+    return resp
+
+@bp.route('/forecast/weekly')
 def forecast_weekly():
-    from forecast import get_weekly_forecast
-    return jsonify(get_weekly_forecast())
+    doc = get_snapshot()
+    if doc is None:
+        return snapshot_pending()
+    return snapshot_response(doc["weekly"][0], doc)
 
-@app.route('/forecast/ingredients')
+@bp.route('/forecast/ingredients')
 def forecast_ingredients():
-    usage = forecast_ingredient_requirements()
-    save_to_db(usage)
-    return jsonify(usage)
+    doc = get_snapshot()
+    if doc is None:
+        return snapshot_pending()
+    return snapshot_response(doc["ingredients"], doc)
+
+@bp.route('/forecast/status')
+def forecast_status():
+    return jsonify(snapshot_meta(latest_snapshot()))
+
+@bp.route('/forecast/refresh', methods=['POST'])
+def forecast_refresh():
+    started = trigger_refresh()
+    return jsonify({"started": started, **snapshot_meta(latest_snapshot())}), 202
+
+@bp.route('/forecast/jobs', methods=['POST'])
+def forecast_job_submit():
+    body = request.get_json(silent=True) or {}
+    kind = body.get("kind")
+    if kind not in JOB_KINDS:
+        return jsonify({"error": f"kind must be one of {sorted(JOB_KINDS)}"}), 400
+
+    params = {}
+    if kind == "weekly":
+        try:
+            params["weeks"] = int(body.get("weeks", 1))
+        except (TypeError, ValueError):
+            return jsonify({"error": "weeks must be a number"}), 400
+        if not 1 <= params["weeks"] <= 52:
+            return jsonify({"error": "weeks must be between 1 and 52"}), 400
+
+    job = jobs.submit(kind, JOB_KINDS[kind], params)
+    return jsonify({"jobId": job["id"], "status": job["status"], "statusUrl": f"/forecast/jobs/{job['id']}"}), 202
+
+@bp.route('/forecast/jobs/<job_id>')
+def forecast_job_status(job_id):
+    # ?wait=N long-polls up to N seconds for the job to finish
+    wait = min(request.args.get("wait", 0, type=float), 60)
+    job = jobs.get(job_id, wait=wait)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200 if job["status"] in ("done", "failed") else 202
+
+@bp.route('/forecast/jobs/<job_id>/stream')
+def forecast_job_stream(job_id):
+    # Server-sent events: a status event at least every 15s, the final one carries the result
+    if jobs.get(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    def events():
+        while True:
+            job = jobs.get(job_id, wait=15)
+            if job is None:
+                return
+            yield f"data: {json.dumps(job)}\n\n"
+            if job["status"] in ("done", "failed"):
+                return
+
+    return Response(events(), mimetype="text/event-stream")
 
 
 # @app.route('/forecast/recommendations')
@@ -26,14 +140,58 @@ def forecast_ingredients():
 #     recs = get_recommendations(user_email=email, lookback_weeks=weeks)
 #     return jsonify(recs)
 
-@app.route('/forecast/recommendations')
+@bp.route('/forecast/recommendations')
 def forecast_recommendations():
     email = request.args.get("email")   # will now receive the actual string
     print("Email from request:", email)
     weeks = request.args.get("weeks")
-    recs = get_recommendations(user_email=email, lookback_weeks=weeks)
+    half_life = request.args.get("halfLife", type=float)
+    recs = get_recommendations(user_email=email, lookback_weeks=weeks, half_life_weeks=half_life,
+                               mode=request.args.get("mode"))
     return jsonify(recs)
 
+@bp.route('/forecast/recommendations/invalidate', methods=['POST'])
+def forecast_recommendations_invalidate():
+    # Called by the backend after a user orders or rates a meal; body: {"email": ...} or {"emails": [...]}
+    body = request.get_json(silent=True) or {}
+    emails = body.get("emails") or ([body["email"]] if body.get("email") else [])
+    if not isinstance(emails, list) or not emails:
+        return jsonify({"error": "Provide 'email' or a non-empty 'emails' list"}), 400
+    for email in emails:
+        mess_assistant.cache.invalidate(email)
+    return jsonify({"invalidated": len(emails)})
+
+@bp.route('/forecast/recommendations/cache')
+def forecast_recommendations_cache():
+    return jsonify(mess_assistant.cache.stats())
+
+@bp.route('/forecast/recommendations/batch', methods=['POST'])
+def forecast_recommendations_batch():
+    # Body: {"emails": [...]} or {"all": true}; response is JSON lines, popular dishes first
+    body = request.get_json(silent=True) or {}
+    emails = body.get("emails")
+    all_active = bool(body.get("all"))
+    if not all_active and not (isinstance(emails, list) and emails):
+        return jsonify({"error": "Provide a non-empty 'emails' list or 'all': true"}), 400
+
+    def lines():
+        for record in iter_batch_recommendations(emails=emails, all_active=all_active, mode=body.get("mode")):
+            yield json.dumps(record, default=str) + "\n"
+
+    return Response(stream_with_context(lines()), mimetype="application/x-ndjson")
+
+
+def create_app():
+    app = Flask(__name__)
+    CORS(app)
+    app.register_blueprint(bp)
+    return app
+
 
 if __name__ == '__main__':
-    app.run(port=5000, debug=True)
+    # Development server; production runs `gunicorn -c gunicorn.conf.py wsgi:app`
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":  # reloader child only, not the file watcher
+        if indexes.ENSURE_ON_STARTUP:
+            indexes.bootstrap()
+        start_refresher()
+    create_app().run(port=5000, debug=True, threaded=True)
@@ -0,0 +1,54 @@
+# ai/forecast_service/bench_forecast.py
+# Serial vs process-pool Prophet training on synthetic weeklyselections history (seed_history.py,
+# seeded into mongomock).
+#   python bench_forecast.py --weeks 104 --horizon 4 --workers 4
+import argparse
+import logging
+import os
+import time
+
+import mongo
+import seed_history
+from forecast import DAYS, MEALS, get_forecast, load_history
+
+
+def seeded_history(weeks=104, students=400, seed=0):
+    # weeklyselections derived from seed_history's synthetic orders, loaded the way the service does
+    import mongomock
+
+    database = mongomock.MongoClient().get_database(mongo.DB_NAME)
+    mongo.use(database)
+    seed_history.seed(database, students=students, weeks=weeks, seed=seed)
+    return load_history()
+
+
+def _time(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial vs parallel Prophet training benchmark")
+    parser.add_argument("--weeks", type=int, default=104)
+    parser.add_argument("--students", type=int, default=400)
+    parser.add_argument("--horizon", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    history = seeded_history(args.weeks, args.students)
+
+    serial_s, serial = _time(lambda: get_forecast(args.horizon, history, workers=1, use_cache=False))
+    cold_s, parallel = _time(lambda: get_forecast(args.horizon, history, workers=args.workers, use_cache=False))
+    warm_s, _ = _time(lambda: get_forecast(args.horizon, history, workers=args.workers, use_cache=False))
+
+    print(f"history: {args.weeks} weeks x {len(DAYS) * len(MEALS)} series, horizon {args.horizon} weeks")
+    print(f"serial                    {serial_s:8.2f}s")
+    print(f"parallel x{args.workers:<3d} (cold pool) {cold_s:8.2f}s")
+    print(f"parallel x{args.workers:<3d} (warm pool) {warm_s:8.2f}s  speedup {serial_s / warm_s:.1f}x")
+    print("results identical:", serial == parallel)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# ai/forecast_service/bench_startup.py
+# Cold import time of the service, each run in a fresh interpreter.
+#   python bench_startup.py --repeat 5
+#   python bench_startup.py --module wsgi
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY = ["pandas", "prophet", "cmdstanpy"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+import mongo
+print(json.dumps({{
+    "seconds": elapsed,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+    "mongoConnected": mongo._client is not None,
+}}))
+"""
+
+
+def measure(module, repeat):
+    here = os.path.dirname(os.path.abspath(__file__))
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)],
+            cwd=here, capture_output=True, text=True, check=True,
+        ).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold import time of the forecast service")
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = measure(args.module, args.repeat)
+    seconds = [r["seconds"] for r in runs]
+    print(f"import {args.module}: min {min(seconds):.3f}s  median {statistics.median(seconds):.3f}s  ({args.repeat} runs)")
+    print("heavy modules loaded:", ", ".join(runs[-1]["heavy"]) or "none")
+    print("Mongo client created at import:", runs[-1]["mongoConnected"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# ai/forecast_service/bom.py
+# Bill of materials: ingredient x dish coefficients compiled once, applied as a sparse mat-vec.
+# Coefficients come from the recipes table (quantity per serving, in the ingredient's unit);
+# ingredients without recipe rows fall back to their perPerson x related-dishes mapping.
+# Columns are individual dishes ("rice"), never whole menu entries ("Rice, Dal, Roti").
+from typing import Any, Dict, List
+
+import numpy as np
+
+from meal_recommender_ai import _split_dish_names
+
+ALL_DISHES = {"all dishes", "most dishes"}
+
+
+def normalize_dish(name: str) -> str:
+    if not isinstance(name, str):
+        return ""
+    return " ".join(name.lower().split())
+
+
+class BillOfMaterials:
+    def __init__(self, ingredients: List[Dict[str, Any]], recipes: List[Dict[str, Any]] = ()):
+        self.names = [ing["name"] for ing in ingredients]
+        self.units = [ing.get("unit", "") for ing in ingredients]
+        self.dish_index: Dict[str, int] = {}
+
+        recipe_rows: Dict[str, List[Any]] = {}
+        for r in recipes:
+            recipe_rows.setdefault(normalize_dish(r.get("ingredient")), []).append(r)
+
+        rows, cols, coefs = [], [], []
+        all_dishes = np.zeros(len(ingredients))
+        for i, ing in enumerate(ingredients):
+            quantities = recipe_rows.get(normalize_dish(ing["name"]))
+            if quantities:
+                for r in quantities:
+                    dish = normalize_dish(r.get("dish"))
+                    if dish:
+                        rows.append(i)
+                        cols.append(self.dish_index.setdefault(dish, len(self.dish_index)))
+                        coefs.append(float(r.get("perServing") or 0))
+                continue
+
+            per_person = ing.get("perPerson", 1)  # default 1 if not provided
+            related = {normalize_dish(d) for d in ing.get("dishes", [])}
+            if related & ALL_DISHES:
+                all_dishes[i] = per_person
+                continue
+            for dish in related:
+                if not dish:
+                    continue
+                rows.append(i)
+                cols.append(self.dish_index.setdefault(dish, len(self.dish_index)))
+                coefs.append(per_person)
+
+        # COO triplets; requirements() is a bincount over rows
+        self.rows = np.asarray(rows, dtype=np.intp)
+        self.cols = np.asarray(cols, dtype=np.intp)
+        self.coefs = np.asarray(coefs, dtype=float)
+        self.all_dishes = all_dishes
+
+    def dish_vector(self, dish_counts: Dict[str, float]):
+        # Servings per known dish, plus the headcount used by "all dishes" ingredients.
+        # Keys may be whole menu entries ("Rice, Dal, Roti"); each dish in them gets the count,
+        # but the entry's people are counted once, so perPerson stays per person.
+        vec = np.zeros(len(self.dish_index))
+        total = 0.0
+        for entry, count in dish_counts.items():
+            total += count
+            for dish in _split_dish_names(entry):
+                j = self.dish_index.get(normalize_dish(dish))
+                if j is not None:
+                    vec[j] += count
+        return vec, total
+
+    def requirements(self, dish_counts: Dict[str, float]) -> np.ndarray:
+        vec, total = self.dish_vector(dish_counts)
+        per_dish = np.bincount(self.rows, weights=self.coefs * vec[self.cols], minlength=len(self.names))
+        return per_dish + self.all_dishes * total
+
+    def usage(self, dish_counts: Dict[str, float]) -> Dict[str, Dict[str, Any]]:
+        totals = self.requirements(dish_counts)
+        return {
+            name: {"unit": unit, "estimated_quantity": int(round(qty))}
+            for name, unit, qty in zip(self.names, self.units, totals)
+        }
+
+
+_compiled = (None, None)
+
+
+def compile_bom(ingredients: List[Dict[str, Any]], recipes: List[Dict[str, Any]] = (),
+                version: str = None) -> BillOfMaterials:
+    # Recompile only when the ingredient catalog / recipe table version changes
+    global _compiled
+    if version is not None and _compiled[0] == version:
+        return _compiled[1]
+    bom = BillOfMaterials(ingredients, recipes)
+    if version is not None:
+        _compiled = (version, bom)
+    return bom
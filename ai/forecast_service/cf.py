@@ -0,0 +1,204 @@
+# ai/forecast_service/cf.py
+# Collaborative-filtering recommender: a user x dish matrix from orders and ratings, factorized
+# offline with a randomized truncated SVD. Serving is one dot product per user against the
+# precomputed dish embeddings.
+#   python cf.py                 # rebuild and save the embeddings (cron / job "recommender")
+#   python cf.py --factors 48
+import argparse
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from meal_recommender_ai import _split_dish_names, compile_menu
+from mongo import db
+from popularity import aggregate_slot_counts
+
+MODEL_PATH = os.getenv(
+    "CF_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".model_cache", "cf.npz"),
+)
+FACTORS = int(os.getenv("CF_FACTORS", "32"))
+RATING_WEIGHT = float(os.getenv("CF_RATING_WEIGHT", "0.5"))  # per star away from a neutral 3
+SEED = int(os.getenv("CF_SEED", "0"))
+
+
+def build_interactions(menu_items=None):
+    # COO triplets (user row, dish column, value) plus the row emails and column dishes.
+    # value = log1p(times ordered) + RATING_WEIGHT * (mean rating - 3)
+    menu = compile_menu(menu_items if menu_items is not None else list(db.menuitems.find({})))
+    email_by_id = {u["_id"]: u["email"] for u in db.users.find({}, {"email": 1}) if u.get("email")}
+
+    ordered = defaultdict(Counter)
+    slot_groups = list(aggregate_slot_counts(by="user").items())
+    slot_groups += aggregate_slot_counts({"user": None}, by="email").items()  # legacy orders keyed by email
+    for key, slots in slot_groups:
+        email = email_by_id.get(key, key if isinstance(key, str) else None)
+        if not email:
+            continue
+        for slot, n in slots.items():
+            for dish in menu.slots.get(slot, ()):
+                ordered[email][dish] += n
+
+    ratings = defaultdict(list)
+    for doc in db.ratings.find({}, {"email": 1, "meals": 1}):
+        for meal in doc.get("meals") or []:
+            if meal.get("rating") is None:
+                continue
+            for dish in _split_dish_names(meal.get("dishName")):
+                ratings[(doc.get("email"), dish)].append(float(meal["rating"]))
+
+    values = defaultdict(float)
+    for email, dishes in ordered.items():
+        for dish, n in dishes.items():
+            values[(email, dish)] += np.log1p(n)
+    for key, stars in ratings.items():
+        if key[0]:
+            values[key] += RATING_WEIGHT * (sum(stars) / len(stars) - 3)
+
+    emails = sorted({e for e, _ in values})
+    dishes = list(menu.dishes) + sorted({d for _, d in values} - set(menu.dishes))
+    row = {e: i for i, e in enumerate(emails)}
+    col = {d: j for j, d in enumerate(dishes)}
+    rows = np.fromiter((row[e] for e, _ in values), dtype=np.intp, count=len(values))
+    cols = np.fromiter((col[d] for _, d in values), dtype=np.intp, count=len(values))
+    vals = np.fromiter(values.values(), dtype=float, count=len(values))
+    return rows, cols, vals, emails, dishes
+
+
+def truncated_svd(matrix, k, oversample=10, power_iters=2, seed=SEED):
+    # Randomized range finder (Halko et al.): a k-dimensional SVD without factorizing the full matrix
+    rng = np.random.default_rng(seed)
+    k = max(1, min(k, *matrix.shape))
+    y = matrix @ rng.standard_normal((matrix.shape[1], min(k + oversample, matrix.shape[1])))
+    for _ in range(power_iters):
+        y, _ = np.linalg.qr(y)
+        y = matrix @ (matrix.T @ y)
+    q, _ = np.linalg.qr(y)
+    u, s, vt = np.linalg.svd(q.T @ matrix, full_matrices=False)
+    return (q @ u)[:, :k], s[:k], vt[:k]
+
+
+def build_model(factors=FACTORS, menu_items=None):
+    rows, cols, vals, emails, dishes = build_interactions(menu_items)
+    if not emails:
+        return None
+    # Dishes number in the hundreds at most, so the matrix is densified for the factorization
+    matrix = np.zeros((len(emails), len(dishes)))
+    matrix[rows, cols] = vals
+    u, s, vt = truncated_svd(matrix, factors)
+    scale = np.sqrt(s)
+    return CFModel(
+        users=(u * scale).astype(np.float32),
+        items=(vt.T * scale).astype(np.float32),
+        emails=emails,
+        dishes=dishes,
+        built_at=time.time(),
+    )
+
+
+class CFModel:
+    """User and dish embeddings; a user's predicted affinity for every dish is one mat-vec."""
+
+    def __init__(self, users, items, emails, dishes, built_at=None):
+        self.users = users
+        self.items = items
+        self.emails = list(emails)
+        self.dishes = list(dishes)
+        self.built_at = built_at
+        self.user_index = {e: i for i, e in enumerate(self.emails)}
+        self.dish_index = {d: j for j, d in enumerate(self.dishes)}
+
+    def save(self, path=MODEL_PATH):
+        # Write then rename, so a serving process never loads a half-written file
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, users=self.users, items=self.items, emails=np.array(self.emails, dtype=str),
+                     dishes=np.array(self.dishes, dtype=str), built_at=np.array(self.built_at or time.time()))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        with np.load(path) as data:
+            return cls(data["users"], data["items"], data["emails"].tolist(), data["dishes"].tolist(),
+                       float(data["built_at"]))
+
+    def _mask(self, dishes):
+        if dishes is None:
+            return None
+        mask = np.zeros(len(self.dishes), dtype=bool)
+        mask[[self.dish_index[d] for d in dishes if d in self.dish_index]] = True
+        return mask
+
+    def _top(self, scores, k, mask):
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [{"dish": self.dishes[j], "score": round(float(scores[j]), 4)} for j in top if np.isfinite(scores[j])]
+
+    def recommend(self, email, k=10, dishes=None):
+        # None for users the model has not seen; `dishes` restricts results (e.g. to the current menu)
+        i = self.user_index.get(email)
+        if i is None:
+            return None
+        return self._top(self.items @ self.users[i], k, self._mask(dishes))
+
+    def recommend_many(self, emails, k=10, dishes=None):
+        rows = [self.user_index.get(e) for e in emails]
+        known = [i for i in rows if i is not None]
+        scores = self.users[known] @ self.items.T if known else None
+        mask = self._mask(dishes)
+        out, n = {}, 0
+        for email, i in zip(emails, rows):
+            if i is not None:
+                out[email] = self._top(scores[n], k, mask)
+                n += 1
+        return out
+
+
+_model = (None, None)  # (file mtime, CFModel)
+_model_lock = threading.Lock()
+
+
+def get_model(path=MODEL_PATH):
+    # Latest saved model; reloaded when an offline rebuild replaces the file
+    global _model
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    if _model[0] != mtime:
+        with _model_lock:
+            if _model[0] != mtime:
+                _model = (mtime, CFModel.load(path))
+    return _model[1]
+
+
+def rebuild(factors=FACTORS, path=MODEL_PATH):
+    started = time.monotonic()
+    model = build_model(factors)
+    if model is None:
+        print("⚠️ No orders or ratings to build the recommender from")
+        return {"users": 0, "dishes": 0}
+    model.save(path)
+    summary = {
+        "users": len(model.emails),
+        "dishes": len(model.dishes),
+        "factors": int(model.users.shape[1]),
+        "seconds": round(time.monotonic() - started, 2),
+    }
+    print(f"🧠 Recommender rebuilt: {summary}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the collaborative-filtering embeddings")
+    parser.add_argument("--factors", type=int, default=FACTORS)
+    parser.add_argument("--out", default=MODEL_PATH)
+    args = parser.parse_args()
+    rebuild(args.factors, args.out)
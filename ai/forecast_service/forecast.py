@@ -1,27 +1,51 @@
-from pymongo import MongoClient
 import pandas as pd
-from prophet import Prophet
-from dotenv import load_dotenv
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import threading
 import os
-
-load_dotenv(dotenv_path='../../backend/config/config.env')
-MONGO_URI = os.getenv('MONGO_URI')
-client = MongoClient(MONGO_URI)
-db = client["Mess"]
+from model_cache import ModelCache, fingerprint
+from mongo import db
 
 DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MEALS = ["breakfast", "lunch", "dinner"]
+SERIES = [(day, meal) for day in DAYS for meal in MEALS]
+PROPHET_PARAMS = {"weekly_seasonality": True, "daily_seasonality": False}
+FIT_SEED = int(os.getenv("FORECAST_SEED", "42"))  # fixed Stan seed => same fit serially or in a worker
+FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", "1"))  # >1 fits series on a process pool
+
+model_cache = ModelCache()
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+def series_key(day, meal_type):
+    return f"{day}_{meal_type}"
 
-def build_df_for(day, meal_type):
-    docs = list(db.weeklyselections.find().sort("weekStart", 1))
-    data = []
+def history_from_docs(docs):
+    # One row per weekStart, one column per day/meal series (NaN where a week has no count)
+    index, rows = [], []
     for d in docs:
-        week_start = d["weekStart"]
-        try:
-            count = d["data"][day][meal_type]
-            data.append({ "ds": week_start, "y": count })
-        except:
-            pass
-    return pd.DataFrame(data)
+        data = d.get("data") or {}
+        row = []
+        for day, meal in SERIES:
+            meals = data.get(day)
+            row.append(meals.get(meal) if isinstance(meals, dict) else None)
+        index.append(d["weekStart"])
+        rows.append(row)
+    columns = [series_key(day, meal) for day, meal in SERIES]
+    history = pd.DataFrame(rows, index=pd.Index(index, name="weekStart"), columns=columns)
+    return history.apply(pd.to_numeric, errors="coerce").sort_index()
+
+def load_history():
+    # Single scan of weeklyselections; every day/meal series is sliced from this frame
+    cursor = db.weeklyselections.find({}, {"_id": 0, "weekStart": 1, "data": 1}).sort("weekStart", 1)
+    return history_from_docs(cursor)
+
+def build_df_for(day, meal_type, history=None):
+    if history is None:
+        history = load_history()
+    col = history[series_key(day, meal_type)].dropna()
+    return pd.DataFrame({"ds": col.index, "y": col.values})
 
 # def train_prophet(df):
 #     model = Prophet(weekly_seasonality=True, daily_seasonality=False)
@@ -46,27 +70,109 @@ def build_df_for(day, meal_type):
 #     return result
 
 
-def get_weekly_forecast(week_offset=0):
-    result = {}
-    for day in DAYS:
-        result[day] = {}
-        for meal in ["breakfast", "lunch", "dinner"]:
-            df = build_df_for(day, meal)
-            if not df.empty:
-                forecast_value = int(round(train_prophet(df, weeks_ahead=week_offset + 1)))
-            else:
-                forecast_value = 0
-            result[day][meal] = forecast_value
+def get_forecast(horizon_weeks=1, history=None, workers=None, use_cache=True):
+    # One fit per series; every future week comes from the same prediction
+    if history is None:
+        history = load_history()
+    if workers is None:
+        workers = FORECAST_WORKERS
+
+    values = {}
+    pending = []
+    for day, meal in SERIES:
+        key = series_key(day, meal)
+        df = build_df_for(day, meal, history)
+        if df.empty:
+            values[key] = [0] * horizon_weeks
+            continue
+        series = key if use_cache else None
+        if workers > 1 and not (use_cache and is_cached(df, key)):
+            pending.append((series, key, df))
+        else:
+            values[key] = forecast_series(df, horizon_weeks=horizon_weeks, series=series)
+
+    if pending:
+        values.update(_forecast_parallel(pending, horizon_weeks, workers))
+
+    weeks = [{day: {} for day in DAYS} for _ in range(horizon_weeks)]
+    for day, meal in SERIES:
+        for week, value in zip(weeks, values[series_key(day, meal)]):
+            week[day][meal] = value
+    return weeks
+
+def get_weekly_forecast(week_offset=0, history=None):
+    result = get_forecast(horizon_weeks=week_offset + 1, history=history)[week_offset]
     print("📅 Forecast result:", result)
     return result
 
-def train_prophet(df, weeks_ahead=1):
-    model = Prophet(weekly_seasonality=True, daily_seasonality=False)
-    model.fit(df)
-    future = model.make_future_dataframe(periods=weeks_ahead, freq='W')
+def fit_prophet(df, series=None):
+    # Reuse the fitted model while the series' rows are unchanged (new week => new fingerprint)
+    if series is None:
+        return _fit(df)
+
+    digest = _digest(df)
+    model = model_cache.get(series, digest)
+    if model is None:
+        model = _fit(df)
+        model_cache.put(series, digest, model)
+    return model
+
+def is_cached(df, series):
+    return model_cache.get(series, _digest(df)) is not None
+
+def _digest(df):
+    return fingerprint(df, {**PROPHET_PARAMS, "seed": FIT_SEED})
+
+def _fit(df):
+    from prophet import Prophet  # imported on first fit: Prophet/cmdstanpy take seconds to load
+
+    model = Prophet(**PROPHET_PARAMS)
+    model.fit(df, seed=FIT_SEED)
+    return model
+
+def _predict(model, horizon_weeks):
+    future = model.make_future_dataframe(periods=horizon_weeks, freq='W')
     forecast = model.predict(future)
-    value = forecast.tail(weeks_ahead).iloc[-1]["yhat"]
-    return max(int(round(value)), 5)  # prevent 0 or negative
+    values = forecast.tail(horizon_weeks)["yhat"]
+    return [max(int(round(v)), 5) for v in values]  # prevent 0 or negative
+
+def forecast_series(df, horizon_weeks=1, series=None):
+    return _predict(fit_prophet(df, series), horizon_weeks)
+
+def train_prophet(df, weeks_ahead=1, series=None):
+    return forecast_series(df, horizon_weeks=weeks_ahead, series=series)[-1]
+
+def _fit_series_job(args):
+    # Runs in a pool worker: fit + predict one series, ship the model back for the parent's cache
+    from prophet.serialize import model_to_json
+
+    df, horizon_weeks, want_model = args
+    model = _fit(df)
+    return _predict(model, horizon_weeks), model_to_json(model) if want_model else None
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn: workers must not inherit Flask/pymongo threads from a forked parent
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+def _forecast_parallel(pending, horizon_weeks, workers):
+    from prophet.serialize import model_from_json
+
+    pool = _get_pool(workers)
+    jobs = [(df, horizon_weeks, series is not None) for series, _, df in pending]
+    values = {}
+    # map() yields in submission order, so results never depend on which worker finishes first
+    for (series, key, df), (series_values, model_json) in zip(pending, pool.map(_fit_series_job, jobs)):
+        values[key] = series_values
+        if series is not None:
+            model_cache.put(series, _digest(df), model_from_json(model_json))
+    return values
 
 
 if __name__ == "__main__":
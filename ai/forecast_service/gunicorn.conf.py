@@ -0,0 +1,25 @@
+# ai/forecast_service/gunicorn.conf.py
+#   gunicorn -c gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+
+bind = os.getenv("FORECAST_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("FORECAST_WEB_WORKERS", str(multiprocessing.cpu_count() * 2 + 1)))
+# gthread: a worker keeps serving cheap requests on its other threads while one waits on Mongo
+worker_class = "gthread"
+threads = int(os.getenv("FORECAST_WEB_THREADS", "4"))
+# Import app (and, unless FORECAST_PRELOAD=0, pandas/Prophet) once in the master; workers share it copy-on-write
+preload_app = True
+timeout = int(os.getenv("FORECAST_WEB_TIMEOUT", "120"))
+keepalive = 5
+max_requests = 2000  # recycle workers to bound memory growth
+max_requests_jitter = 200
+accesslog = "-"
+
+
+def post_fork(server, worker):
+    import mongo
+    from snapshots import start_refresher
+
+    mongo.reset()  # the master's client must not be used across fork; connect lazily per worker
+    start_refresher()  # every worker runs one; the Mongo lease elects a single trainer
@@ -0,0 +1,109 @@
+# ai/forecast_service/indexes.py
+# Indexes behind the service's hot queries, plus an explain() check that none of them scans
+# a whole collection. Runs once at startup (wsgi.py, app.py) and as a CLI:
+#   python indexes.py            # create missing indexes, then check the query plans
+#   python indexes.py --check    # only check; exit 1 if a hot query is a COLLSCAN
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure, PyMongoError
+from bson import ObjectId
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+from mongo import db
+
+ENSURE_ON_STARTUP = os.getenv("FORECAST_ENSURE_INDEXES", "1") == "1"
+STRICT = os.getenv("FORECAST_INDEX_STRICT", "0") == "1"  # refuse to start when a hot query is a COLLSCAN
+
+# (collection, keys, options)
+INDEXES = [
+    ("orders", [("user", ASCENDING), ("createdAt", DESCENDING)], {}),
+    ("orders", [("email", ASCENDING), ("createdAt", DESCENDING)], {}),
+    ("orders", [("createdAt", ASCENDING)], {}),  # popularity watermark and lookback windows
+    ("users", [("email", ASCENDING)], {}),
+    ("weeklyselections", [("weekStart", ASCENDING)], {"unique": True}),  # same as the mongoose schema
+    ("ratings", [("email", ASCENDING), ("day", ASCENDING)], {"unique": True}),  # same as the mongoose schema
+    ("dish_popularity_weekly", [("weekStart", ASCENDING)], {}),
+    ("forecast_snapshots", [("createdAt", DESCENDING)], {}),
+    # per-worker recommendation cache counters; recycled workers' documents age out after a day
+    ("recommendation_cache_stats", [("updatedAt", ASCENDING)], {"expireAfterSeconds": 86400}),
+]
+
+
+def hot_queries():
+    # (name, collection, filter, sort) shaped like the service's real queries
+    recent = datetime.now(timezone.utc) - timedelta(weeks=4)
+    return [
+        ("orders by user", "orders", {"user": ObjectId()}, [("createdAt", DESCENDING)]),
+        ("orders by email", "orders", {"email": "someone@example.com"}, [("createdAt", DESCENDING)]),
+        ("orders since watermark", "orders", {"createdAt": {"$gt": recent}}, [("createdAt", ASCENDING)]),
+        ("user by email", "users", {"email": "someone@example.com"}, None),
+        ("weekly history", "weeklyselections", {"weekStart": {"$gte": recent}}, [("weekStart", ASCENDING)]),
+        ("weekly popularity", "dish_popularity_weekly", {"weekStart": {"$gte": recent}}, None),
+        ("latest snapshot", "forecast_snapshots", {}, [("createdAt", DESCENDING)]),
+    ]
+
+
+def ensure_indexes():
+    created = []
+    for collection, keys, options in INDEXES:
+        try:
+            created.append(f"{collection}.{db[collection].create_index(keys, **options)}")
+        except OperationFailure as e:
+            # e.g. an index on the same keys with other options; leave it and let the plan check judge
+            print(f"⚠️ Could not create index {keys} on {collection}: {e}")
+    return created
+
+
+def _stages(plan):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _stages(item)
+
+
+def check_plans(strict=STRICT):
+    # Names of hot queries whose winning plan contains a COLLSCAN
+    scans = []
+    for name, collection, query, sort in hot_queries():
+        find = {"find": collection, "filter": query, "limit": 1}
+        if sort:
+            find["sort"] = dict(sort)
+        try:
+            plan = db.command({"explain": find, "verbosity": "queryPlanner"})
+            winning = plan.get("queryPlanner", {}).get("winningPlan", {})
+        except (OperationFailure, NotImplementedError) as e:
+            print(f"⚠️ Could not explain '{name}': {e}")
+            continue
+        if "COLLSCAN" in set(_stages(winning)):
+            scans.append(name)
+            print(f"⚠️ '{name}' on {collection} is a COLLSCAN")
+    if scans and strict:
+        raise RuntimeError(f"Hot queries without a supporting index: {', '.join(scans)}")
+    return scans
+
+
+def bootstrap(strict=STRICT):
+    try:
+        created = ensure_indexes()
+        scans = check_plans(strict)
+    except PyMongoError as e:
+        if strict:
+            raise
+        print("❌ Index bootstrap failed:", e)
+        return [], []
+    print(f"🗂️ {len(created)} indexes ensured, {len(scans)} hot queries scanning")
+    return created, scans
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create and check the indexes behind the service's hot queries")
+    parser.add_argument("--check", action="store_true", help="only check query plans")
+    args = parser.parse_args()
+    scans = check_plans(strict=False) if args.check else bootstrap(strict=False)[1]
+    sys.exit(1 if scans else 0)
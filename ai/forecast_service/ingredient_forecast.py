@@ -1,14 +1,17 @@
-from pymongo import MongoClient
+from pymongo import DESCENDING
+from pymongo.errors import DuplicateKeyError, OperationFailure
+import hashlib
+import json
 import os
-from dotenv import load_dotenv
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
-load_dotenv(dotenv_path='../../backend/config/config.env')
-MONGO_URI = os.getenv('MONGO_URI')
-client = MongoClient(MONGO_URI)
-db = client.get_database("Mess")
+RETENTION_DAYS = int(os.getenv("INGREDIENT_FORECAST_RETENTION_DAYS", "90"))  # TTL on ingredient_forecasts
+_indexes_ready = False
 
-from forecast import get_weekly_forecast as fetch_weekly_forecast
+from forecast import get_forecast, DAYS, MEALS
+from bom import compile_bom
+from meal_recommender_ai import _split_dish_names
+from mongo import db
 
 def get_menu():
     return list(db.menuitems.find({}))
@@ -16,94 +19,135 @@ def get_menu():
 def get_ingredients():
     return list(db.ingredients.find({}))
 
+def get_recipes():
+    return list(db.recipes.find({}, {"_id": 0, "dish": 1, "ingredient": 1, "perServing": 1}))
+
 # def get_forecast_data():
 #     # return fetch_weekly_forecast()  # no args
 
-def get_forecast_data():
-    monthly_forecast = {}
-    DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+def get_forecast_data(weeks=4, weekly_forecasts=None):
+    monthly_forecast = {day: {meal: 0 for meal in MEALS} for day in DAYS}
+    if weekly_forecasts is None:
+        weekly_forecasts = get_forecast(horizon_weeks=weeks)
 
-    # Sum 4 weeks' forecasts
-    for week in range(4):
-        weekly = fetch_weekly_forecast(week_offset=week)  # <-- we will add support for this
+    # Sum the next 4 weeks, all taken from a single fit per day/meal series
+    for weekly in weekly_forecasts[:weeks]:
         for day in DAYS:
-            if day not in monthly_forecast:
-                monthly_forecast[day] = {"breakfast": 0, "lunch": 0, "dinner": 0}
-            for meal in ["breakfast", "lunch", "dinner"]:
+            for meal in MEALS:
                 monthly_forecast[day][meal] += weekly[day][meal]
-    
+
     return monthly_forecast
 
 
-def forecast_ingredient_requirements():
+def forecast_ingredient_requirements(weekly_forecasts=None):
+    return build_ingredient_forecast(weekly_forecasts)[0]
+
+
+def build_ingredient_forecast(weekly_forecasts=None):
+    # (usage, input fingerprint) -- the fingerprint covers menu, ingredients and the summed forecast
     menu = get_menu()
     ingredients = get_ingredients()
-    forecast = get_forecast_data()
+    recipes = get_recipes()
+    forecast = get_forecast_data(weekly_forecasts=weekly_forecasts)
+    usage = estimate_usage(menu, ingredients, forecast, recipes)
+    return usage, _hash({"menu": menu, "ingredients": ingredients, "recipes": recipes, "forecast": forecast})
+
+
+def estimate_usage(menu, ingredients, forecast, recipes=()):
+    menu_by_day = {}
+    for m in menu:
+        menu_by_day.setdefault(m["day"].lower(), m)
 
     dish_counts = {}
     for weekday, counts in forecast.items():
-        menu_for_day = next((m for m in menu if m["day"].lower() == weekday), None)
+        menu_for_day = menu_by_day.get(weekday)
         if not menu_for_day:
             continue
 
-        for meal_type in ['breakfast', 'lunch', 'dinner']:
+        for meal_type in MEALS:
             if meal_type not in counts:
                 continue
-            people = counts[meal_type]
-            dishes = menu_for_day[meal_type].split(" with ")
-            for dish in dishes:
-                dish = dish.strip()
-                if dish:
-                    dish_counts[dish] = dish_counts.get(dish, 0) + people
-
-    # ingredient_usage = {}
-    # for ing in ingredients:
-    #     related_dishes = [d.lower() for d in ing.get('dishes', [])]
-    #     if 'all dishes' in related_dishes or 'most dishes' in related_dishes:
-    #         estimated_total = sum(dish_counts.values())
-    #     else:
-    #         estimated_total = sum(
-    #             dish_counts.get(dish, 0)
-    #             for dish in dish_counts
-    #             if dish.lower() in related_dishes
-    #         )
-    #     ingredient_usage[ing["name"]] = {
-    #         "unit": ing.get("unit", ""),
-    #         "estimated_quantity": estimated_total
-    #     }
-
-    # return ingredient_usage
-
-    ingredient_usage = {}
-    for ing in ingredients:
-        per_person_qty = ing.get("perPerson", 1)  # default 1 if not provided
-        related_dishes = [d.lower() for d in ing.get('dishes', [])]
-        
-        if 'all dishes' in related_dishes or 'most dishes' in related_dishes:
-            estimated_total = sum(dish_counts.values()) * per_person_qty
-        else:
-            estimated_total = sum(
-                dish_counts.get(dish, 0)
-                for dish in dish_counts
-                if dish.lower() in related_dishes
-            ) * per_person_qty
-        
-        ingredient_usage[ing["name"]] = {
-            "unit": ing.get("unit", ""),
-            "estimated_quantity": int(round(estimated_total))
-        }
-
-    return ingredient_usage
-
-def save_to_db(forecast_data):
-    db.ingredient_forecasts.insert_one({
+            entry = menu_for_day.get(meal_type)
+            if not _split_dish_names(entry):
+                continue
+            # Keyed by the whole entry ("Rice, Dal, Sabzi"): the BOM gives each dish in it the
+            # count for recipe rows, but counts the people once for perPerson fallbacks
+            dish_counts[entry] = dish_counts.get(entry, 0) + counts[meal_type]
+
+    bom = compile_bom(ingredients, recipes, version=_hash([ingredients, recipes]))
+    return bom.usage(dish_counts)
+
+def forecast_period(now=None):
+    # Forecasts cover the weeks starting next Monday (UTC)
+    now = now or datetime.now(timezone.utc)
+    monday = (now + timedelta(days=7 - now.weekday())).date()
+    return datetime(monday.year, monday.month, monday.day, tzinfo=timezone.utc)
+
+def _hash(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+def _ensure_indexes():
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    coll = db.ingredient_forecasts
+    coll.create_index([("periodStart", 1), ("weeks", 1), ("version", 1)], unique=True, sparse=True)
+    ttl = RETENTION_DAYS * 24 * 3600
+    try:
+        coll.create_index("timestamp", expireAfterSeconds=ttl)
+    except OperationFailure:
+        # retention changed since the index was created
+        db.command("collMod", "ingredient_forecasts", index={"keyPattern": {"timestamp": 1}, "expireAfterSeconds": ttl})
+    _indexes_ready = True
+
+def load_latest(weeks=4, period=None):
+    period = period or forecast_period()
+    return db.ingredient_forecasts.find_one(
+        {"periodStart": period, "weeks": weeks}, sort=[("version", DESCENDING)]
+    )
+
+def save_to_db(forecast_data, fingerprint=None, weeks=4):
+    # Idempotent: a new version is written only when the inputs or the result changed for the period
+    _ensure_indexes()
+    period = forecast_period()
+    result_hash = _hash(forecast_data)
+    latest = load_latest(weeks, period)
+    if latest is not None and (
+        latest.get("resultHash") == result_hash
+        or (fingerprint is not None and latest.get("inputFingerprint") == fingerprint)
+    ):
+        return latest
+
+    version = (latest or {}).get("version", 0) + 1
+    doc = {
+        "periodStart": period,
+        "weeks": weeks,
+        "version": version,
+        "inputFingerprint": fingerprint,
+        "resultHash": result_hash,
         "timestamp": datetime.now(timezone.utc),
-        "forecast": forecast_data
-    })
+        "forecast": forecast_data,
+    }
+    try:
+        db.ingredient_forecasts.update_one(
+            {"periodStart": period, "weeks": weeks, "version": version},
+            {"$setOnInsert": doc},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        pass  # a concurrent writer stored this version first
+    return load_latest(weeks, period)
+
+def get_ingredient_forecast(weeks=4):
+    # Read-through: pure read when the current period is already stored
+    doc = load_latest(weeks)
+    if doc is None:
+        usage, fingerprint = build_ingredient_forecast()
+        doc = save_to_db(usage, fingerprint=fingerprint, weeks=weeks)
+    return doc["forecast"]
 
 if __name__ == "__main__":
-    usage = forecast_ingredient_requirements()
-    print("📅 Forecast result saved.\n🛒 Ingredient Forecast for Next Week:\n")
+    usage = get_ingredient_forecast()
+    print("📅 Forecast result saved.\n🛒 Ingredient Forecast for the next 4 weeks:\n")
     for name, data in usage.items():
         print(f"{name}: {data['estimated_quantity']} {data['unit']}")
-    save_to_db(usage)
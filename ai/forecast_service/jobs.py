@@ -0,0 +1,173 @@
+# ai/forecast_service/jobs.py
+# In-process job queue: long forecast work runs on its own worker threads, requests only
+# get a job id back and poll (or stream) the result. With an optional Mongo `store`, job
+# state is mirrored so a poll landing on another WSGI worker still finds the job. The owning
+# process heartbeats its unfinished jobs; a job whose owner stops (worker recycled or killed)
+# reads as failed once the heartbeat goes stale.
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+JOB_WORKERS = int(os.getenv("FORECAST_JOB_WORKERS", "2"))
+JOB_TTL = int(os.getenv("FORECAST_JOB_TTL", "3600"))  # seconds a finished job stays pollable
+JOB_HEARTBEAT = int(os.getenv("FORECAST_JOB_HEARTBEAT", "10"))  # seconds between owner heartbeats
+JOB_STALE = int(os.getenv("FORECAST_JOB_STALE", str(6 * JOB_HEARTBEAT)))  # no heartbeat for this long => failed
+
+
+class JobQueue:
+    def __init__(self, workers=JOB_WORKERS, ttl=JOB_TTL, store=None):
+        self.ttl = ttl
+        self.store = store  # callable returning a collection, resolved per call (clients are per process)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="forecast-job")
+        self._jobs = {}
+        self._done = {}
+        self._lock = threading.Lock()
+        self._store_ready = False
+        self._heartbeat = None
+
+    def submit(self, kind, fn, params=None):
+        # An identical job that is still queued/running is reused instead of queued twice
+        params = params or {}
+        with self._lock:
+            self._expire()
+            for job in self._jobs.values():
+                if job["kind"] == kind and job["params"] == params and job["status"] in ("queued", "running"):
+                    return dict(job)
+            job = {
+                "id": uuid.uuid4().hex,
+                "kind": kind,
+                "params": params,
+                "status": "queued",
+                "owner": _owner(),
+                "createdAt": _now(),
+                "startedAt": None,
+                "finishedAt": None,
+                "result": None,
+                "error": None,
+            }
+            self._jobs[job["id"]] = job
+            self._done[job["id"]] = threading.Event()
+        self._save(job)
+        self._start_heartbeat()
+        self._executor.submit(self._run, job["id"], fn, params)
+        return dict(job)
+
+    def get(self, job_id, wait=0):
+        # wait > 0 long-polls until the job finishes or the timeout passes
+        event = self._done.get(job_id)
+        if event is None:
+            return self._load(job_id, wait)
+        if wait > 0:
+            event.wait(wait)
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _run(self, job_id, fn, params):
+        self._update(job_id, status="running", startedAt=_now())
+        try:
+            result = fn(**params)
+            self._update(job_id, status="done", result=result, finishedAt=_now())
+        except Exception as e:
+            self._update(job_id, status="failed", error=str(e), finishedAt=_now())
+        finally:
+            self._done[job_id].set()
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            job = dict(job)
+        self._save(job)
+
+    def _save(self, job):
+        if self.store is None:
+            return
+        try:
+            coll = self.store()
+            if not self._store_ready:
+                coll.create_index("expireAt", expireAfterSeconds=0)
+                self._store_ready = True
+            doc = {k: v for k, v in job.items() if k != "id"}
+            doc["heartbeatAt"] = datetime.now(timezone.utc)
+            doc["expireAt"] = doc["heartbeatAt"] + timedelta(seconds=self.ttl)
+            coll.replace_one({"_id": job["id"]}, doc, upsert=True)
+        except Exception as e:
+            print("⚠️ Could not persist job state:", e)
+
+    def _load(self, job_id, wait=0):
+        # Job owned by another process: poll the shared store
+        if self.store is None:
+            return None
+        deadline = time.monotonic() + wait
+        while True:
+            doc = self.store().find_one({"_id": job_id}, {"expireAt": 0})
+            if doc is None:
+                return None
+            if doc["status"] not in ("done", "failed") and self._is_stale(doc):
+                doc = self._fail_stale(doc)
+            if doc["status"] in ("done", "failed") or time.monotonic() >= deadline:
+                doc.pop("heartbeatAt", None)
+                doc["id"] = doc.pop("_id")
+                return doc
+            time.sleep(0.5)
+
+    def _is_stale(self, doc):
+        beat = doc.get("heartbeatAt")
+        if beat is None:
+            return False
+        if beat.tzinfo is None:
+            beat = beat.replace(tzinfo=timezone.utc)
+        return (datetime.now(timezone.utc) - beat).total_seconds() > JOB_STALE
+
+    def _fail_stale(self, doc):
+        # The owning process died with the job unfinished; record it so every poller agrees
+        fields = {
+            "status": "failed",
+            "error": f"Worker {doc.get('owner')} stopped before the job finished",
+            "finishedAt": _now(),
+        }
+        self.store().update_one({"_id": doc["_id"], "status": doc["status"], "heartbeatAt": doc["heartbeatAt"]}, {"$set": fields})
+        return {**doc, **fields}
+
+    def _start_heartbeat(self):
+        # One thread per process, started on first submit (threads do not survive a fork)
+        if self.store is None or (self._heartbeat is not None and self._heartbeat.is_alive()):
+            return
+        self._heartbeat = threading.Thread(target=self._beat, name="forecast-job-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def _beat(self):
+        while True:
+            time.sleep(JOB_HEARTBEAT)
+            with self._lock:
+                active = [job_id for job_id, job in self._jobs.items() if job["status"] in ("queued", "running")]
+            if not active:
+                continue
+            try:
+                self.store().update_many(
+                    {"_id": {"$in": active}, "status": {"$in": ["queued", "running"]}},
+                    {"$set": {"heartbeatAt": datetime.now(timezone.utc)}},
+                )
+            except Exception as e:
+                print("⚠️ Could not heartbeat jobs:", e)
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        for job_id, job in list(self._jobs.items()):
+            finished = job["finishedAt"]
+            if finished and datetime.fromisoformat(finished).timestamp() < cutoff:
+                del self._jobs[job_id]
+                del self._done[job_id]
+
+
+def _owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
@@ -1,6 +1,11 @@
 # ai/forecast_service/meal_recommender_ai.py
+import hashlib
+import json
+import threading
 from collections import Counter
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Union
+
+import numpy as np
 
 def _normalize_day_key(day_name: str) -> str:
     if not isinstance(day_name, str):
@@ -16,7 +21,8 @@ def _split_dish_names(dish_name: str):
         return [p.strip() for p in dish_name.split(",") if p.strip()]
     return [dish_name.strip()]
 
-def extract_dishes_from_order(order: Dict[str, Any], menu_lookup: Dict[str, Dict[str, str]]):
+def extract_slots_from_order(order: Dict[str, Any]):
+    # (day, meal) pairs the order selected, independent of what the menu serves there
     out = []
     sel = order.get("selected") or order.get("selections") or order.get("selectedMeals") or {}
     if not isinstance(sel, dict):
@@ -24,23 +30,25 @@ def extract_dishes_from_order(order: Dict[str, Any], menu_lookup: Dict[str, Dict
 
     for day_key, meals in sel.items():
         day = _normalize_day_key(day_key)
-        if not day:
-            continue
-        menu_for_day = menu_lookup.get(day, {})
-        if not isinstance(meals, dict):
+        if not day or not isinstance(meals, dict):
             continue
-
         for meal_type, chosen in meals.items():
-            if not chosen:
-                continue
-            meal_key = meal_type.strip().lower()
-            dish_name = menu_for_day.get(meal_key)
-            if not dish_name:
-                continue
-            out.extend(_split_dish_names(dish_name))
+            if chosen:
+                out.append((day, meal_type.strip().lower()))
+    return out
+
+def extract_dishes_from_order(order: Dict[str, Any], menu: Union["CompiledMenu", Dict[str, Dict[str, str]]]):
+    if isinstance(menu, CompiledMenu):
+        return menu.dishes_for_order(order)
+    out = []
+    for day, meal_key in extract_slots_from_order(order):
+        dish_name = menu.get(day, {}).get(meal_key)
+        if not dish_name:
+            continue
+        out.extend(_split_dish_names(dish_name))
     return out
 
-def generate_popular(orders: List[Dict[str, Any]], menu_items: List[Dict[str, Any]], top_n: int = 20):
+def build_menu_lookup(menu_items: List[Dict[str, Any]]):
     menu_lookup = {}
     for m in menu_items:
         day = _normalize_day_key(m.get("day") or "")
@@ -51,27 +59,137 @@ def generate_popular(orders: List[Dict[str, Any]], menu_items: List[Dict[str, An
             "lunch":     (m.get("lunch") or "").strip(),
             "dinner":    (m.get("dinner") or "").strip()
         }
+    return menu_lookup
 
-    counter = Counter()
-    for o in orders:
-        counter.update(extract_dishes_from_order(o, menu_lookup))
+def menu_version(menu_items: List[Dict[str, Any]]) -> str:
+    rows = [[m.get("day"), m.get("breakfast"), m.get("lunch"), m.get("dinner")] for m in menu_items]
+    return hashlib.sha1(json.dumps(rows, default=str).encode()).hexdigest()
 
-    return [{"dish": dish, "count": cnt} for dish, cnt in counter.most_common(top_n)]
+class CompiledMenu:
+    """Menu compiled once per version: (day, meal) -> pre-split tuple of dish names.
 
-def compute_user_top(user_orders: List[Dict[str, Any]], menu_items: List[Dict[str, Any]], top_n: int = 10):
-    menu_lookup = {}
-    for m in menu_items:
-        day = _normalize_day_key(m.get("day") or "")
-        if not day:
-            continue
-        menu_lookup[day] = {
-            "breakfast": (m.get("breakfast") or "").strip(),
-            "lunch":     (m.get("lunch") or "").strip(),
-            "dinner":    (m.get("dinner") or "").strip()
-        }
+    Dishes are interned as integer ids and every served (day, meal) slot gets a bit, so
+    an order encodes to one int mask and counting is a bincount over slot totals.
+    Raw order keys ("Monday", " Lunch") are normalized once and memoized.
+    """
+
+    def __init__(self, menu_items: List[Dict[str, Any]], version: str = None):
+        self.version = version or menu_version(menu_items)
+        self.slots: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+        for day, meals in build_menu_lookup(menu_items).items():
+            for meal_key, dish_name in meals.items():
+                if dish_name:
+                    self.slots[(day, meal_key)] = tuple(_split_dish_names(dish_name))
+
+        self.slot_keys = list(self.slots)
+        self.slot_bit = {slot: i for i, slot in enumerate(self.slot_keys)}
+        self.dishes: List[str] = []
+        self.dish_ids: Dict[str, int] = {}
+        entry_slot, entry_dish = [], []
+        for i, slot in enumerate(self.slot_keys):
+            for dish in self.slots[slot]:
+                entry_slot.append(i)
+                entry_dish.append(self.dish_ids.setdefault(dish, len(self.dishes)))
+                if entry_dish[-1] == len(self.dishes):
+                    self.dishes.append(dish)
+        # one entry per (slot, dish) occurrence; a dish listed twice in a slot counts twice
+        self._entry_slot = np.asarray(entry_slot, dtype=np.intp)
+        self._entry_dish = np.asarray(entry_dish, dtype=np.intp)
+        self._raw_slots: Dict[Tuple[Any, Any], Tuple[str, ...]] = {}
+        self._raw_bits: Dict[Tuple[Any, Any], int] = {}
+
+    def _slot_key(self, day_key, meal_type):
+        meal_key = meal_type.strip().lower() if isinstance(meal_type, str) else ""
+        return (_normalize_day_key(day_key), meal_key)
+
+    def dishes_for(self, day_key, meal_type) -> Tuple[str, ...]:
+        dishes = self._raw_slots.get((day_key, meal_type))
+        if dishes is None:
+            dishes = self.slots.get(self._slot_key(day_key, meal_type), ())
+            self._raw_slots[(day_key, meal_type)] = dishes
+        return dishes
+
+    def dishes_for_order(self, order: Dict[str, Any]) -> List[str]:
+        out = []
+        sel = order.get("selected") or order.get("selections") or order.get("selectedMeals") or {}
+        if not isinstance(sel, dict):
+            return out
+        for day_key, meals in sel.items():
+            if not isinstance(meals, dict):
+                continue
+            for meal_type, chosen in meals.items():
+                if chosen:
+                    out.extend(self.dishes_for(day_key, meal_type))
+        return out
+
+    def order_mask(self, order: Dict[str, Any]) -> int:
+        # Bitmask of the served slots an order selected
+        mask = 0
+        sel = order.get("selected") or order.get("selections") or order.get("selectedMeals") or {}
+        if not isinstance(sel, dict):
+            return mask
+        for day_key, meals in sel.items():
+            if not isinstance(meals, dict):
+                continue
+            for meal_type, chosen in meals.items():
+                if chosen:
+                    bit = self._raw_bits.get((day_key, meal_type))
+                    if bit is None:
+                        i = self.slot_bit.get(self._slot_key(day_key, meal_type))
+                        bit = 0 if i is None else 1 << i
+                        self._raw_bits[(day_key, meal_type)] = bit
+                    mask |= bit
+        return mask
 
-    counter = Counter()
-    for o in user_orders:
-        counter.update(extract_dishes_from_order(o, menu_lookup))
+    def slot_counts(self, orders: List[Dict[str, Any]]) -> np.ndarray:
+        # Orders per slot: unpack the uint64 masks to bits and sum the columns
+        masks = np.fromiter((self.order_mask(o) for o in orders), dtype=np.uint64, count=len(orders))
+        bits = np.unpackbits(masks.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+        return bits[:, :len(self.slot_keys)].sum(axis=0, dtype=np.int64)
 
+    def dish_counts(self, slot_counts: np.ndarray) -> np.ndarray:
+        return np.bincount(self._entry_dish, weights=slot_counts[self._entry_slot], minlength=len(self.dishes))
+
+    def rank(self, dish_counts: np.ndarray, top_n: int):
+        # Highest count first, ties by dish id (first appearance in the menu)
+        order = np.argsort(-dish_counts, kind="stable")[:top_n]
+        return [{"dish": self.dishes[i], "count": _count(dish_counts[i])} for i in order if dish_counts[i] > 0]
+
+    def top_dishes(self, orders: List[Dict[str, Any]], top_n: int):
+        if not self.slot_keys or len(self.slot_keys) > 64:
+            return _rank_counter(Counter(d for o in orders for d in self.dishes_for_order(o)), top_n)
+        return self.rank(self.dish_counts(self.slot_counts(orders)), top_n)
+
+_compiled_menu = None
+_compiled_menu_lock = threading.Lock()
+
+def compile_menu(menu_items: Union[CompiledMenu, List[Dict[str, Any]]]) -> CompiledMenu:
+    # Rebuilt only when menuitems changes (different version hash)
+    global _compiled_menu
+    if isinstance(menu_items, CompiledMenu):
+        return menu_items
+    version = menu_version(menu_items)
+    with _compiled_menu_lock:
+        if _compiled_menu is None or _compiled_menu.version != version:
+            _compiled_menu = CompiledMenu(menu_items, version)
+        return _compiled_menu
+
+def popular_from_slot_counts(slot_counts: Dict[Any, int], menu_items, top_n: int = 20):
+    # Same ranking as generate_popular, from per-(day, meal) order counts instead of raw orders
+    menu = compile_menu(menu_items)
+    # Counts may be fractional (time-decayed scores)
+    counts = np.array([max(slot_counts.get(slot, 0), 0) for slot in menu.slot_keys], dtype=float)
+    return menu.rank(menu.dish_counts(counts), top_n)
+
+def _count(value):
+    value = float(value)
+    return int(value) if value.is_integer() else round(value, 2)
+
+def _rank_counter(counter: Counter, top_n: int):
     return [{"dish": dish, "count": cnt} for dish, cnt in counter.most_common(top_n)]
+
+def generate_popular(orders: List[Dict[str, Any]], menu_items, top_n: int = 20):
+    return compile_menu(menu_items).top_dishes(orders, top_n)
+
+def compute_user_top(user_orders: List[Dict[str, Any]], menu_items, top_n: int = 10):
+    return compile_menu(menu_items).top_dishes(user_orders, top_n)
@@ -1,32 +1,131 @@
 # ai/forecast_service/mess_assistant.py
-from pymongo import MongoClient
 import os
-from dotenv import load_dotenv
-from meal_recommender_ai import generate_popular, compute_user_top
+from datetime import datetime, timedelta, timezone
+from cf import get_model
+from meal_recommender_ai import compile_menu, compute_user_top, popular_from_slot_counts
+from mongo import db
+from popularity import aggregate_slot_counts, decayed, get_popular, user_weekly_slot_counts, window_match
+from recommendation_cache import RecommendationCache
 
-load_dotenv(dotenv_path='../../backend/config/config.env')
-MONGO_URI = os.getenv('MONGO_URI')
-client = MongoClient(MONGO_URI)
-db = client.get_database("Mess")
+# "aggregate": MongoDB counts the user's (day, meal) picks over all their orders;
+# "orders": the newest sample_limit orders are pulled and counted in Python
+COUNT_MODE = os.getenv("RECOMMENDER_COUNT_MODE", "aggregate")
+RECOMMENDED_K = int(os.getenv("CF_TOP_K", "10"))
 
-def get_recommendations(user_email: str = None, sample_limit: int = 2000, debug: bool = False, **kwargs):
-    menu_items = list(db.menuitems.find({}))
-    global_orders = list(db.orders.find({}).sort("createdAt", -1).limit(sample_limit))
+# Per-user results, invalidated by the Node backend when the user orders or rates a meal
+cache = RecommendationCache(store=lambda: db.recommendation_versions, stats_store=lambda: db.recommendation_cache_stats)
+
+def get_recommendations(user_email: str = None, sample_limit: int = 2000, debug: bool = False, mode: str = None,
+                        lookback_weeks=None, half_life_weeks=None, **kwargs):
+    # lookback_weeks limits both rankings to recent weeks, scored with exponential decay
+    lookback_weeks = _positive_int(lookback_weeks)
+    if not user_email or debug:
+        return _compute_recommendations(user_email, sample_limit, mode, lookback_weeks, half_life_weeks)
+    variant = (mode or COUNT_MODE, sample_limit, lookback_weeks, half_life_weeks)
+    return cache.get_or_compute(user_email, variant, lambda: _compute_recommendations(
+        user_email, sample_limit, mode, lookback_weeks, half_life_weeks))
 
-    popular = generate_popular(global_orders, menu_items, top_n=50)
+def _compute_recommendations(user_email, sample_limit, mode, lookback_weeks, half_life_weeks):
+    menu_items = list(db.menuitems.find({}))
+    popular = get_popular(menu_items, top_n=50, lookback_weeks=lookback_weeks, half_life_weeks=half_life_weeks)
     user_top = []
 
     if user_email:
         user_doc = db.users.find_one({"email": user_email}, {"_id": 1})
         user_id = user_doc["_id"] if user_doc else None
 
-        user_orders = []
-        if user_id:
-            user_orders = list(db.orders.find({"user": user_id}).sort("createdAt", -1).limit(sample_limit))
-        if not user_orders:
-            user_orders = list(db.orders.find({"email": user_email}).sort("createdAt", -1).limit(sample_limit))
+        if (mode or COUNT_MODE) == "aggregate":
+            slot_counts = _user_slot_counts({"user": user_id}, lookback_weeks, half_life_weeks) if user_id else {}
+            if not slot_counts:
+                slot_counts = _user_slot_counts({"email": user_email}, lookback_weeks, half_life_weeks)
+            user_top = popular_from_slot_counts(slot_counts, menu_items, top_n=20) if slot_counts else []
+        else:
+            window = window_match(lookback_weeks) if lookback_weeks else {}
+            user_orders = []
+            if user_id:
+                user_orders = list(db.orders.find({"user": user_id, **window}).sort("createdAt", -1).limit(sample_limit))
+            if not user_orders:
+                user_orders = list(db.orders.find({"email": user_email, **window}).sort("createdAt", -1).limit(sample_limit))
+
+            if user_orders:
+                user_top = compute_user_top(user_orders, menu_items, top_n=20)
+
+    return {"popular": popular, "user": user_top, "recommended": _recommended(user_email, menu_items)}
+
+def _recommended(user_email, menu_items):
+    # Collaborative-filtering picks among the dishes on the current menu; [] until the
+    # offline model exists or for users it has not seen yet
+    model = get_model() if user_email else None
+    if model is None:
+        return []
+    return model.recommend(user_email, k=RECOMMENDED_K, dishes=compile_menu(menu_items).dishes) or []
+
+def _user_slot_counts(match, lookback_weeks, half_life_weeks):
+    if not lookback_weeks:
+        return aggregate_slot_counts(match)
+    return decayed(user_weekly_slot_counts(match, lookback_weeks), half_life_weeks)
+
+def _positive_int(value):
+    # lookback arrives as a query-string value; anything unusable means "no window"
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+ACTIVE_WEEKS = int(os.getenv("RECOMMENDER_ACTIVE_WEEKS", "8"))  # "all active users" = ordered within this window
+ORDER_FIELDS = {"user": 1, "email": 1, "createdAt": 1, "selected": 1, "selections": 1, "selectedMeals": 1}
+
+def iter_batch_recommendations(emails=None, all_active: bool = False, sample_limit: int = 2000, mode: str = None):
+    # Yields {"popular": [...]} once, then one {"email", "user"} record per requested user.
+    # Users resolve in one $in query; their slot counts (or orders) come grouped from aggregations.
+    menu_items = list(db.menuitems.find({}))
+    yield {"popular": get_popular(menu_items, top_n=50)}
+
+    if all_active:
+        cutoff = datetime.now(timezone.utc) - timedelta(weeks=ACTIVE_WEEKS)
+        active_ids = db.orders.distinct("user", {"createdAt": {"$gte": cutoff}})
+        users = list(db.users.find({"_id": {"$in": active_ids}}, {"_id": 1, "email": 1}))
+        emails = [u["email"] for u in users]
+    else:
+        emails = list(dict.fromkeys(e for e in (emails or []) if e))
+        users = list(db.users.find({"email": {"$in": emails}}, {"_id": 1, "email": 1}))
+
+    email_by_id = {u["_id"]: u["email"] for u in users}
+    if (mode or COUNT_MODE) == "aggregate":
+        counts_by_user = aggregate_slot_counts({"user": {"$in": list(email_by_id)}}, by="user")
+        counts_by_email = aggregate_slot_counts({"email": {"$in": emails}}, by="email")
+        id_by_email = {email: uid for uid, email in email_by_id.items()}
+        for email in emails:
+            slot_counts = counts_by_user.get(id_by_email.get(email)) or counts_by_email.get(email)
+            user_top = popular_from_slot_counts(slot_counts, menu_items, top_n=20) if slot_counts else []
+            yield {"email": email, "user": user_top, "recommended": _recommended(email, menu_items)}
+        return
+
+    pipeline = [
+        {"$match": {"$or": [{"user": {"$in": list(email_by_id)}}, {"email": {"$in": emails}}]}},
+        {"$project": ORDER_FIELDS},
+        # $topN keeps at most sample_limit orders per group while grouping (MongoDB 5.2+), so a
+        # heavy user never builds an unbounded array against the 16MB / 100MB group limits
+        {"$group": {"_id": {"user": "$user", "email": "$email"}, "orders": {"$topN": {
+            "n": sample_limit, "sortBy": {"createdAt": -1}, "output": "$$ROOT",
+        }}}},
+    ]
+    by_user, by_email = {}, {}
+    for group in db.orders.aggregate(pipeline, allowDiskUse=True):
+        key = group["_id"]
+        if key.get("user") in email_by_id:
+            by_user.setdefault(key["user"], []).extend(group["orders"])
+        elif key.get("email"):
+            by_email.setdefault(key["email"], []).extend(group["orders"])
 
-        if user_orders:
-            user_top = compute_user_top(user_orders, menu_items, top_n=20)
+    id_by_email = {email: uid for uid, email in email_by_id.items()}
+    for email in emails:
+        # Same precedence as get_recommendations: orders by user id, else by email
+        user_orders = by_user.get(id_by_email.get(email)) or by_email.get(email) or []
+        user_orders = sorted(user_orders, key=_created_at, reverse=True)[:sample_limit]
+        user_top = compute_user_top(user_orders, menu_items, top_n=20) if user_orders else []
+        yield {"email": email, "user": user_top, "recommended": _recommended(email, menu_items)}
 
-    return {"popular": popular, "user": user_top}
+def _created_at(order):
+    return order.get("createdAt") or datetime.min
@@ -0,0 +1,121 @@
+# ai/forecast_service/model_cache.py
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+CACHE_DIR = os.getenv(
+    "FORECAST_MODEL_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".model_cache"),
+)
+MEMORY_SIZE = int(os.getenv("FORECAST_MODEL_CACHE_SIZE", "64"))
+DISK_SIZE = int(os.getenv("FORECAST_MODEL_CACHE_DISK_SIZE", "256"))
+
+
+def fingerprint(df: pd.DataFrame, params: dict = None) -> str:
+    # Hash of the (ds, y) rows plus the model params, stable across processes
+    h = hashlib.sha1(json.dumps(params or {}, sort_keys=True).encode())
+    if not df.empty:
+        rows = pd.DataFrame({"ds": pd.to_datetime(df["ds"]), "y": df["y"].astype(float)})
+        h.update(pd.util.hash_pandas_object(rows, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+class ModelCache:
+    """LRU cache of fitted Prophet models, in memory and as serialized JSON on disk.
+
+    Keys are (series, fingerprint); storing a new fingerprint for a series drops the
+    older on-disk models of that series, so a retrain happens only when its rows change.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, memory_size=MEMORY_SIZE, disk_size=DISK_SIZE):
+        self.cache_dir = cache_dir
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, series, digest):
+        return os.path.join(self.cache_dir, f"{series}-{digest}.json")
+
+    def get(self, series, digest):
+        key = (series, digest)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                return model
+
+        path = self._path(series, digest)
+        if not self.disk_size or not os.path.exists(path):
+            return None
+        from prophet.serialize import model_from_json  # deferred with the rest of Prophet
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                model = model_from_json(f.read())
+            os.utime(path)  # mark as recently used for disk eviction
+        except (OSError, ValueError, KeyError):
+            self._remove(path)
+            return None
+
+        self._remember(key, model)
+        return model
+
+    def put(self, series, digest, model):
+        self._remember((series, digest), model)
+        if not self.disk_size:
+            return
+
+        from prophet.serialize import model_to_json
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(series, digest)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(model_to_json(model))
+        os.replace(tmp, path)
+
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(f"{series}-") and name.endswith(".json") and name != os.path.basename(path):
+                self._remove(os.path.join(self.cache_dir, name))
+        self._evict_disk()
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".json"):
+                    self._remove(os.path.join(self.cache_dir, name))
+
+    def _remember(self, key, model):
+        if not self.memory_size:
+            return
+        with self._lock:
+            self._models[key] = model
+            self._models.move_to_end(key)
+            while len(self._models) > self.memory_size:
+                self._models.popitem(last=False)
+
+    def _evict_disk(self):
+        files = [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(".json")
+        ]
+        if len(files) <= self.disk_size:
+            return
+        files.sort(key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0)
+        for path in files[: len(files) - self.disk_size]:
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
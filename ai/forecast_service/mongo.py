@@ -0,0 +1,61 @@
+# ai/forecast_service/mongo.py
+# One MongoClient per process, created on first use. Service modules do `from mongo import db`
+# and query it as before (db.orders.find(...)); importing them never opens a connection.
+import os
+import threading
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+load_dotenv(dotenv_path='../../backend/config/config.env')
+MONGO_URI = os.getenv('MONGO_URI')
+DB_NAME = "Mess"
+
+_client = None
+_db = None
+_lock = threading.Lock()
+
+
+def get_client():
+    global _client, _db
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _db = MongoClient(MONGO_URI).get_database(DB_NAME)
+                _client = _db.client
+    return _client
+
+
+def get_db():
+    get_client()
+    return _db
+
+
+def reset():
+    # Forget the client, e.g. one inherited across fork; the next use connects afresh
+    global _client, _db
+    with _lock:
+        _client, _db = None, None
+
+
+def use(database):
+    # Point the shared handle at another database, e.g. mongomock for offline benchmarks
+    global _client, _db
+    with _lock:
+        _client, _db = database.client, database
+
+
+class _LazyDatabase:
+    """Stands in for the Mess database, resolving the shared client on every access."""
+
+    def __getattr__(self, name):
+        return getattr(get_db(), name)
+
+    def __getitem__(self, name):
+        return get_db()[name]
+
+    def __repr__(self):
+        return f"<lazy database {DB_NAME!r}>"
+
+
+db = _LazyDatabase()
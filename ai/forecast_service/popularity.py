@@ -0,0 +1,218 @@
+# ai/forecast_service/popularity.py
+# Global dish popularity maintained incrementally: per-(day, meal) order counters advanced
+# from a createdAt watermark, kept in memory and in the dish_popularity summary collection.
+# Counting slots rather than dishes means a menu change never forces a recount.
+from pymongo.errors import DuplicateKeyError
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from meal_recommender_ai import _normalize_day_key, compile_menu, extract_slots_from_order, popular_from_slot_counts
+from mongo import db
+
+REFRESH_SECONDS = float(os.getenv("POPULARITY_REFRESH_SECONDS", "5"))  # min gap between catch-up queries
+SUMMARY_ID = "global"
+HALF_LIFE_WEEKS = float(os.getenv("POPULARITY_HALF_LIFE_WEEKS", "4"))  # decay for lookback scores; 0 = plain window
+WEEK_MS = 7 * 24 * 3600 * 1000
+ORDER_FIELDS = {"selected": 1, "selections": 1, "selectedMeals": 1, "createdAt": 1}
+SCANNED = datetime(1970, 1, 1)  # watermark after a full scan that found no createdAt (legacy orders only)
+
+# orders -> one row per chosen (day, meal); same field fallbacks and truthiness as extract_slots_from_order
+SLOT_STAGES = [
+    {"$project": {"user": 1, "email": 1, "createdAt": 1, "sel": {"$ifNull": ["$selected", {"$ifNull": ["$selections", {"$ifNull": ["$selectedMeals", {}]}]}]}}},
+    {"$match": {"sel": {"$type": "object"}}},
+    {"$project": {"user": 1, "email": 1, "createdAt": 1, "days": {"$objectToArray": "$sel"}}},
+    {"$unwind": "$days"},
+    {"$match": {"days.v": {"$type": "object"}}},
+    {"$project": {"user": 1, "email": 1, "createdAt": 1, "day": "$days.k", "meals": {"$objectToArray": "$days.v"}}},
+    {"$unwind": "$meals"},
+    {"$match": {"meals.v": {"$nin": [False, None, 0, ""]}}},
+]
+
+
+def aggregate_slot_counts(match=None, by=None):
+    # Count chosen (day, meal) slots inside MongoDB; only the grouped counts cross the wire.
+    # With `by` (a field name such as "user", or an expression), returns {by value: Counter}.
+    group_id = {"day": "$day", "meal": "$meals.k"}
+    if by:
+        group_id["by"] = f"${by}" if isinstance(by, str) else by
+    pipeline = ([{"$match": match}] if match else []) + SLOT_STAGES + [
+        {"$group": {"_id": group_id, "count": {"$sum": 1}}},
+    ]
+    counts = {}
+    for row in db.orders.aggregate(pipeline, allowDiskUse=True):
+        key = row["_id"]
+        day, meal = _normalize_day_key(key["day"]), key["meal"].strip().lower()
+        if day:
+            counts.setdefault(key.get("by"), Counter())[(day, meal)] += row["count"]
+    if by:
+        return counts
+    return counts.get(None, Counter())
+
+
+def week_start(dt=None):
+    # Monday 00:00 UTC of dt's week, naive like the datetimes pymongo returns
+    dt = dt or datetime.now(timezone.utc)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return datetime(dt.year, dt.month, dt.day) - timedelta(days=dt.weekday())
+
+
+def week_bucket(start):
+    # Aggregation expression: whole weeks between `start` and the order's createdAt
+    return {"$floor": {"$divide": [{"$subtract": ["$createdAt", start]}, WEEK_MS]}}
+
+
+def window_match(lookback_weeks, now=None):
+    # The current (partial) week plus lookback_weeks - 1 full weeks before it
+    return {"createdAt": {"$gte": week_start(now) - timedelta(weeks=lookback_weeks - 1)}}
+
+
+def decayed(counts_by_age, half_life_weeks=None):
+    # Sum per-week slot counts, weighting a week `age` weeks old by 0.5 ** (age / half_life)
+    if half_life_weeks is None:
+        half_life_weeks = HALF_LIFE_WEEKS
+    total = Counter()
+    for age, counts in counts_by_age:
+        weight = 0.5 ** (age / half_life_weeks) if half_life_weeks and half_life_weeks > 0 else 1.0
+        for slot, n in counts.items():
+            total[slot] += n * weight
+    return total
+
+
+def weekly_slot_counts(lookback_weeks, now=None):
+    # [(age in weeks, Counter)] for the current week and the lookback_weeks - 1 before it, read
+    # from the dish_popularity_weekly rollups. Finished weeks are counted once and never again;
+    # the open week is recounted at most every REFRESH_SECONDS.
+    current = week_start(now)
+    starts = [current - timedelta(weeks=age) for age in range(lookback_weeks)]
+    docs = {d["weekStart"]: d for d in db.dish_popularity_weekly.find({"weekStart": {"$gte": starts[-1], "$lte": current}})}
+
+    fresh_after = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=REFRESH_SECONDS)
+    missing = [s for s in starts if s not in docs or (not docs[s].get("closed") and docs[s]["updatedAt"] < fresh_after)]
+    if missing:
+        docs.update(_rollup_weeks(min(missing), max(missing) + timedelta(weeks=1), current))
+
+    return [
+        (age, Counter({(x["day"], x["meal"]): x["count"] for x in docs[s].get("slots", [])}))
+        for age, s in enumerate(starts)
+    ]
+
+
+def _rollup_weeks(start, end, current):
+    # One aggregation for the whole [start, end) range, bucketed by week
+    by_week = aggregate_slot_counts({"createdAt": {"$gte": start, "$lt": end}}, by=week_bucket(start))
+    updated = datetime.now(timezone.utc).replace(tzinfo=None)
+    docs = {}
+    ws = start
+    while ws < end:
+        counts = by_week.get(int((ws - start) / timedelta(weeks=1)), Counter())
+        doc = {
+            "weekStart": ws,
+            "slots": [{"day": d, "meal": m, "count": n} for (d, m), n in counts.items()],
+            "closed": ws < current,
+            "updatedAt": updated,
+        }
+        db.dish_popularity_weekly.replace_one({"_id": ws.strftime("%Y-%m-%d")}, doc, upsert=True)
+        docs[ws] = doc
+        ws += timedelta(weeks=1)
+    return docs
+
+
+def user_weekly_slot_counts(match, lookback_weeks, now=None):
+    # Per-user counterpart of weekly_slot_counts: one aggregation over the user's orders in the window
+    start = week_start(now) - timedelta(weeks=lookback_weeks - 1)
+    by_week = aggregate_slot_counts({**match, **window_match(lookback_weeks, now)}, by=week_bucket(start))
+    return [(lookback_weeks - 1 - int(b), counts) for b, counts in by_week.items()]
+
+
+class PopularityStore:
+    def __init__(self, refresh_seconds=REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.slots = Counter()
+        self.watermark = None
+        self._loaded = False
+        self._checked_at = 0.0
+        self._ranking = (None, [])  # ((watermark, menu key), ranked dishes)
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False):
+        # Catch up on orders newer than the watermark; at most once per refresh_seconds
+        with self._lock:
+            if not force and time.monotonic() - self._checked_at < self.refresh_seconds:
+                return
+            self._checked_at = time.monotonic()
+
+            if not self._loaded:
+                # Cold start only: afterwards memory is ahead of (or equal to) the saved summary
+                self._loaded = True
+                self._load_summary()
+                if self.watermark is None:
+                    self._initial_count()
+
+            query = {"createdAt": {"$gt": self.watermark}} if self.watermark is not None else {}
+            cursor = db.orders.find(query, ORDER_FIELDS).sort("createdAt", 1)
+            seen = 0
+            for order in cursor:
+                self.slots.update(extract_slots_from_order(order))
+                if order.get("createdAt") is not None:
+                    self.watermark = order["createdAt"]
+                seen += 1
+            if self.watermark is None:
+                # Every order was counted but none has a createdAt; only read newer orders from now on
+                self.watermark = SCANNED
+
+            if seen:
+                self._save_summary()
+
+    def top(self, menu_items, top_n=20):
+        self.refresh()
+        menu = compile_menu(menu_items)
+        key = (self.watermark, menu.version)
+        cached_key, ranked = self._ranking
+        if cached_key != key or len(ranked) < top_n:
+            ranked = popular_from_slot_counts(self.slots, menu, top_n=max(top_n, 50))
+            self._ranking = (key, ranked)
+        return ranked[:top_n]
+
+    def _initial_count(self):
+        # Cold start without a summary: one server-side aggregation instead of streaming every order
+        latest = db.orders.find_one({"createdAt": {"$ne": None}}, {"createdAt": 1}, sort=[("createdAt", -1)])
+        if latest is None:
+            return
+        self.watermark = latest["createdAt"]
+        self.slots = aggregate_slot_counts({"$or": [{"createdAt": {"$lte": self.watermark}}, {"createdAt": None}]})
+        self._save_summary()
+
+    def _load_summary(self):
+        doc = db.dish_popularity.find_one({"_id": SUMMARY_ID})
+        # A summary without a watermark can't be caught up from without recounting everything
+        if doc and doc.get("watermark") is not None:
+            self.slots = Counter({(s["day"], s["meal"]): s["count"] for s in doc.get("slots", [])})
+            self.watermark = doc.get("watermark")
+
+    def _save_summary(self):
+        # Only move the shared summary forward; another worker may already be ahead
+        slots = [{"day": d, "meal": m, "count": n} for (d, m), n in self.slots.items()]
+        query = {"_id": SUMMARY_ID}
+        if self.watermark is not None:
+            query["$or"] = [{"watermark": {"$lt": self.watermark}}, {"watermark": None}]
+        try:
+            db.dish_popularity.update_one(
+                query, {"$set": {"slots": slots, "watermark": self.watermark}}, upsert=True
+            )
+        except DuplicateKeyError:
+            pass  # summary already ahead of us; memory state is still valid
+
+
+store = PopularityStore()
+
+
+def get_popular(menu_items, top_n=20, lookback_weeks=None, half_life_weeks=None):
+    # All-time counts from the incremental store, or a decayed score over the last lookback_weeks
+    if not lookback_weeks:
+        return store.top(menu_items, top_n)
+    slot_counts = decayed(weekly_slot_counts(lookback_weeks), half_life_weeks)
+    return popular_from_slot_counts(slot_counts, menu_items, top_n)
@@ -0,0 +1,83 @@
+# ai/forecast_service/recipes.py
+# Bulk import of the recipe-quantity table: (dish, ingredient) -> quantity per serving.
+#   python recipes.py recipes.csv            # columns: dish,ingredient,quantity,unit
+#   python recipes.py recipes.json --replace # [{"dish", "ingredient", "quantity", "unit"}, ...]
+# Quantities are converted to the ingredient's own unit (e.g. 120 g of Rice -> 0.12 kg),
+# so the estimator can apply them without any per-request conversion.
+from pymongo import UpdateOne
+import csv
+import json
+import sys
+
+from bom import normalize_dish
+from mongo import db
+
+# unit -> (dimension, factor to the dimension's base unit)
+UNITS = {
+    "mg": ("mass", 0.001), "g": ("mass", 1), "gram": ("mass", 1), "grams": ("mass", 1),
+    "kg": ("mass", 1000), "kgs": ("mass", 1000),
+    "ml": ("volume", 1), "l": ("volume", 1000), "liter": ("volume", 1000), "liters": ("volume", 1000),
+    "litre": ("volume", 1000), "litres": ("volume", 1000),
+    "piece": ("count", 1), "pieces": ("count", 1), "pcs": ("count", 1),
+}
+
+
+def convert(quantity, unit, target_unit):
+    unit, target_unit = (unit or "").strip().lower(), (target_unit or "").strip().lower()
+    # Ingredients may have no unit (it's optional in the schema): keep the quantity as given
+    if not unit or not target_unit or unit == target_unit:
+        return float(quantity)
+    src, dst = UNITS.get(unit), UNITS.get(target_unit)
+    if src is None or dst is None or src[0] != dst[0]:
+        raise ValueError(f"cannot convert {unit!r} to {target_unit!r}")
+    return float(quantity) * src[1] / dst[1]
+
+
+def read_rows(path):
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith(".json"):
+            return json.load(f)
+        return list(csv.DictReader(f))
+
+
+def import_recipes(rows, replace=False):
+    ingredients = {normalize_dish(i["name"]): i for i in db.ingredients.find({}, {"name": 1, "unit": 1})}
+
+    ops, errors = [], []
+    for n, row in enumerate(rows, start=1):
+        dish = (row.get("dish") or "").strip()
+        ing = ingredients.get(normalize_dish(row.get("ingredient")))
+        if not dish or ing is None:
+            errors.append(f"row {n}: unknown ingredient {row.get('ingredient')!r} or missing dish")
+            continue
+        try:
+            quantity = float(row.get("quantity"))
+            per_serving = convert(quantity, row.get("unit") or "g", ing.get("unit"))
+        except (TypeError, ValueError) as e:
+            errors.append(f"row {n}: {e}")
+            continue
+
+        key = {"dish": normalize_dish(dish), "ingredient": ing["name"]}
+        ops.append(UpdateOne(key, {"$set": {
+            **key,
+            "quantity": quantity,
+            "unit": row.get("unit") or "g",
+            "perServing": per_serving,
+        }}, upsert=True))
+
+    if replace:
+        db.recipes.delete_many({})
+    db.recipes.create_index([("dish", 1), ("ingredient", 1)], unique=True)
+    if ops:
+        db.recipes.bulk_write(ops, ordered=False)
+    return len(ops), errors
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python recipes.py <recipes.csv|recipes.json> [--replace]")
+        sys.exit(1)
+    imported, errors = import_recipes(read_rows(sys.argv[1]), replace="--replace" in sys.argv)
+    for e in errors:
+        print("⚠️ ", e)
+    print(f"🍲 Imported {imported} recipe rows ({len(errors)} skipped)")
@@ -0,0 +1,131 @@
+# ai/forecast_service/recommendation_cache.py
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", "10000"))  # users kept per worker
+CACHE_TTL = int(os.getenv("RECOMMENDATION_CACHE_TTL", "600"))  # seconds; bounds drift of the shared popular list
+STATS_FLUSH = int(os.getenv("RECOMMENDATION_CACHE_STATS_FLUSH", "10"))  # seconds between counter writes per worker
+
+
+class RecommendationCache:
+    """Per-user LRU of computed recommendations, keyed by email and then by request variant.
+
+    With a `store` (callable returning a collection), every email has a version counter in
+    Mongo: invalidate() bumps it, and an entry computed under an older version is a miss.
+    That keeps all WSGI workers coherent while a hit still costs only one point read.
+
+    With a `stats_store`, each worker writes its counters to one document (at most every
+    STATS_FLUSH seconds), and stats() sums them across workers.
+    """
+
+    def __init__(self, size=CACHE_SIZE, ttl=CACHE_TTL, store=None, stats_store=None):
+        self.size = size
+        self.ttl = ttl
+        self.store = store
+        self.stats_store = stats_store
+        self._flushed = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._users = OrderedDict()  # email -> {variant: (version, expires, value)}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, email, variant, compute):
+        version = self._version(email)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(email, {}).get(variant)
+            if version is not None and entry and entry[0] == version and entry[1] > now:
+                self._users.move_to_end(email)
+                self.hits += 1
+                hit = entry[2]
+            else:
+                hit = None
+                self.misses += 1
+        self._maybe_flush()
+        if hit is not None:
+            return hit
+
+        value = compute()
+        if version is None:
+            return value
+        with self._lock:
+            self._users.setdefault(email, {})[variant] = (version, now + self.ttl, value)
+            self._users.move_to_end(email)
+            while len(self._users) > self.size:
+                self._users.popitem(last=False)
+        return value
+
+    def invalidate(self, email):
+        with self._lock:
+            self._users.pop(email, None)
+            self.invalidations += 1
+        if self.store is not None:
+            self.store().update_one(
+                {"_id": email},
+                {"$inc": {"version": 1}, "$set": {"updatedAt": datetime.now(timezone.utc)}},
+                upsert=True,
+            )
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+    def stats(self):
+        # Totals over the workers with counters in the store (live ones, and recycled ones until
+        # their document expires), plus each worker's own numbers with its pid
+        workers = [self._counters()]
+        if self.stats_store is not None:
+            try:
+                self._flush()
+                workers = list(self.stats_store().find({}, {"_id": 0}).sort("worker", 1))
+            except Exception as e:
+                print("⚠️ Could not read recommendation cache stats:", e)
+        totals = {key: sum(w.get(key, 0) for w in workers) for key in ("users", "hits", "misses", "invalidations")}
+        lookups = totals["hits"] + totals["misses"]
+        return {
+            **totals,
+            "size": self.size,
+            "ttlSeconds": self.ttl,
+            "hitRate": round(totals["hits"] / lookups, 4) if lookups else None,
+            "workers": workers,
+        }
+
+    def _counters(self):
+        with self._lock:
+            return {
+                "worker": f"{socket.gethostname()}:{os.getpid()}",
+                "pid": os.getpid(),
+                "users": len(self._users),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+    def _maybe_flush(self):
+        if self.stats_store is not None and time.monotonic() - self._flushed >= STATS_FLUSH:
+            try:
+                self._flush()
+            except Exception as e:
+                print("⚠️ Could not write recommendation cache stats:", e)
+
+    def _flush(self):
+        # Absolute counters, so a repeated or lost write never double counts
+        self._flushed = time.monotonic()
+        counters = self._counters()
+        counters["updatedAt"] = datetime.now(timezone.utc)
+        self.stats_store().replace_one({"_id": counters["worker"]}, counters, upsert=True)
+
+    def _version(self, email):
+        if self.store is None:
+            return 0
+        try:
+            doc = self.store().find_one({"_id": email}, {"version": 1})
+        except Exception as e:
+            print("⚠️ Could not read recommendation cache version:", e)
+            return None  # never matches a cached version, so the request recomputes
+        return doc["version"] if doc else 0
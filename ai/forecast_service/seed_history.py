@@ -0,0 +1,187 @@
+# ai/forecast_service/seed_history.py
+# Synthetic history for offline benchmarks: users, their weekly orders and ratings, and the
+# weeklyselections / dailyselections aggregates derived from those same orders, bulk-inserted.
+#   python seed_history.py --uri mongodb://localhost:27017 --students 400 --weeks 156 --drop
+#   python seed_history.py --mock --students 20000 --weeks 104     # mongomock, timing only
+# The target is always explicit (never MONGO_URI), and non-local hosts need --force.
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from bson import ObjectId
+from pymongo import MongoClient
+from pymongo.uri_parser import parse_uri
+
+import mongo
+from forecast import DAYS, MEALS
+
+COLLECTIONS = ["users", "orders", "ratings", "weeklyselections", "dailyselections"]
+BATCH = 5000
+START = datetime(2023, 1, 2)  # a Monday
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+# Used when the database has no menuitems yet; seeded alongside the history
+DEFAULT_MENU = [
+    {"day": "monday", "breakfast": "Idli, Sambar, Tea", "lunch": "Rice, Dal, Roti", "dinner": "Biryani, Raita"},
+    {"day": "tuesday", "breakfast": "Poha, Tea", "lunch": "Rice, Dal, Roti", "dinner": "Paneer, Roti"},
+    {"day": "wednesday", "breakfast": "Upma, Coffee", "lunch": "Rajma, Rice", "dinner": "Chole, Bhature"},
+    {"day": "thursday", "breakfast": "Paratha, Curd", "lunch": "Rice, Dal, Roti", "dinner": "Veg Pulao, Raita"},
+    {"day": "friday", "breakfast": "Dosa, Chutney, Tea", "lunch": "Kadhi, Rice", "dinner": "Paneer, Roti"},
+    {"day": "saturday", "breakfast": "Poha, Tea", "lunch": "Sambar, Rice", "dinner": "Biryani, Raita"},
+    {"day": "sunday", "breakfast": "Puri, Bhaji", "lunch": "Chole, Rice", "dinner": "Pizza"},
+]
+
+
+class HistoryModel:
+    """
+    Per-slot demand for every student and week: a slot base rate, the student's taste for it,
+    a yearly cycle with trend, and whether the student buys that week at all. Every collection
+    is derived from the same draws, so weekly totals always equal the seeded orders.
+    """
+
+    def __init__(self, students, seed=0, skew=0.5, season=0.15, trend=0.002, weekly_buy=0.85):
+        self.rng = np.random.default_rng(seed)
+        shape = (len(DAYS), len(MEALS))
+        self.base = self.rng.uniform(0.35, 0.8, size=shape)
+        self.taste = self.rng.normal(0.0, skew, size=(students, *shape)) if skew else np.zeros((students, *shape))
+        self.buyer = self.rng.uniform(weekly_buy - 0.15, min(1.0, weekly_buy + 0.15), size=students)
+        self.season = season
+        self.trend = trend
+
+    def week(self, w):
+        # (students, 7, 3) bool: the slots each student selected in week w (all False = no order)
+        factor = 1 + self.season * np.sin(2 * np.pi * w / 52) + self.trend * w
+        p = np.clip(self.base * np.exp(self.taste) * factor, 0, 1)
+        buys = self.rng.random(len(self.buyer)) < self.buyer
+        return (self.rng.random(p.shape) < p) & buys[:, None, None]
+
+    def ratings(self, students):
+        # 1..5 per (student, day, meal); liked slots rate higher
+        noise = self.rng.uniform(-2.5, 2.5, size=self.taste[students].shape)
+        return np.clip(np.rint(3 + self.taste[students] + noise), 1, 5).astype(int)
+
+
+def _insert(collection, docs):
+    for i in range(0, len(docs), BATCH):
+        collection.insert_many(docs[i:i + BATCH], ordered=False)
+    return len(docs)
+
+
+def _selected(mask):
+    return {day: {meal: bool(mask[i, j]) for j, meal in enumerate(MEALS)} for i, day in enumerate(DAYS)}
+
+
+def is_local(uri):
+    # mongodb+srv always names a remote cluster (e.g. Atlas); otherwise check every host
+    if uri.startswith("mongodb+srv://"):
+        return False
+    return all(host in LOCAL_HOSTS for host, _ in parse_uri(uri)["nodelist"])
+
+
+def seed(database, students=400, weeks=104, start=START, seed=0, skew=0.5, season=0.15, drop=False):
+    if start.weekday() != 0:
+        raise ValueError("start must be a Monday, like every weekStart")
+    # `database` is required: seeding (and drop=True) must never default to the app's database
+    if drop:
+        for name in COLLECTIONS:
+            database[name].delete_many({})
+    elif any(database[name].estimated_document_count() for name in COLLECTIONS):
+        raise RuntimeError("Target already has history; pass drop=True (--drop) to replace it")
+
+    started = time.monotonic()
+    menu = list(database.menuitems.find({}, {"_id": 0}))
+    if not menu:
+        database.menuitems.insert_many([dict(m) for m in DEFAULT_MENU])
+        menu = DEFAULT_MENU
+    dish = {(m["day"], meal): m.get(meal) for m in menu for meal in MEALS}
+
+    model = HistoryModel(students, seed=seed, skew=skew, season=season)
+    ids = [ObjectId() for _ in range(students)]
+    emails = [f"student{i:05d}@example.edu" for i in range(students)]
+    inserted = {"users": _insert(database.users, [
+        {"_id": ids[i], "googleId": f"seed-{i}", "displayName": f"Student {i}", "email": emails[i]}
+        for i in range(students)
+    ])}
+
+    orders = 0
+    ever = np.zeros((students, len(DAYS), len(MEALS)), dtype=bool)
+    last_week = np.zeros((students, len(DAYS), len(MEALS)), dtype=int)
+    weekly, daily = [], []
+    for w in range(weeks):
+        week_start = start + timedelta(weeks=w)
+        chosen = model.week(w)
+        ever |= chosen
+        last_week[chosen] = w
+        counts = chosen.sum(axis=0)
+
+        # Orders for the coming week are placed over the preceding weekend
+        buyers = np.flatnonzero(chosen.any(axis=(1, 2)))
+        offsets = model.rng.integers(1, 72 * 60, size=len(buyers))
+        orders += _insert(database.orders, [
+            {"user": ids[s], "selected": _selected(chosen[s]), "status": "completed",
+             "createdAt": week_start - timedelta(minutes=int(m))}
+            for s, m in zip(buyers, offsets)
+        ])
+        weekly.append({
+            "weekStart": week_start,
+            "data": {day: {meal: int(counts[i, j]) for j, meal in enumerate(MEALS)} for i, day in enumerate(DAYS)},
+        })
+        daily += [
+            {"date": week_start + timedelta(days=i), **{meal: int(counts[i, j]) for j, meal in enumerate(MEALS)}}
+            for i in range(len(DAYS))
+        ]
+    inserted["orders"] = orders
+    inserted["weeklyselections"] = _insert(database.weeklyselections, weekly)
+    inserted["dailyselections"] = _insert(database.dailyselections, daily)
+
+    # One ratings doc per (email, weekday), like the app: the latest rating of each meal eaten that day
+    ratings = []
+    for first in range(0, students, BATCH):
+        block = np.arange(first, min(first + BATCH, students))
+        stars = model.ratings(block)
+        for k, s in enumerate(block):
+            for i, day in enumerate(DAYS):
+                meals = [
+                    {"mealType": meal, "dishName": dish[(day, meal)], "rating": int(stars[k, i, j]),
+                     "createdAt": start + timedelta(weeks=int(last_week[s, i, j]), days=i)}
+                    for j, meal in enumerate(MEALS) if ever[s, i, j] and dish.get((day, meal))
+                ]
+                if meals:
+                    ratings.append({"email": emails[s], "day": day, "meals": meals})
+    inserted["ratings"] = _insert(database.ratings, ratings)
+
+    inserted["seconds"] = round(time.monotonic() - started, 2)
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed synthetic order/rating/selection history")
+    parser.add_argument("--students", type=int, default=400)
+    parser.add_argument("--weeks", type=int, default=104)
+    parser.add_argument("--start", type=datetime.fromisoformat, default=START, help="first weekStart (a Monday)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skew", type=float, default=0.5, help="per-student taste spread (0 = identical students)")
+    parser.add_argument("--season", type=float, default=0.15, help="yearly cycle amplitude")
+    parser.add_argument("--drop", action="store_true", help="clear the seeded collections first")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--uri", help="MongoDB to seed, e.g. mongodb://localhost:27017")
+    target.add_argument("--mock", action="store_true", help="seed an in-memory mongomock database")
+    parser.add_argument("--db", default=mongo.DB_NAME, help="database name")
+    parser.add_argument("--force", action="store_true", help="allow a non-local --uri")
+    args = parser.parse_args()
+
+    if args.mock:
+        import mongomock
+        database = mongomock.MongoClient().get_database(args.db)
+    else:
+        if not is_local(args.uri) and not args.force:
+            parser.error("--uri is not a local MongoDB; pass --force to seed (and with --drop, wipe) it anyway")
+        database = MongoClient(args.uri).get_database(args.db)
+    summary = seed(database, students=args.students, weeks=args.weeks, start=args.start, seed=args.seed,
+                   skew=args.skew, season=args.season, drop=args.drop)
+    print(f"🌱 Seeded history: {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# ai/forecast_service/snapshots.py
+from pymongo import DESCENDING
+from pymongo.errors import DuplicateKeyError
+import os
+import socket
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from mongo import db
+
+HORIZON_WEEKS = 4
+REFRESH_INTERVAL = int(os.getenv("FORECAST_REFRESH_INTERVAL", str(6 * 3600)))  # seconds, 0 disables the refresher
+MAX_AGE = int(os.getenv("FORECAST_SNAPSHOT_MAX_AGE", str(2 * REFRESH_INTERVAL or 24 * 3600)))  # older => stale
+KEEP_SNAPSHOTS = int(os.getenv("FORECAST_SNAPSHOT_KEEP", "20"))
+RETRY_AFTER = int(os.getenv("FORECAST_RETRY_AFTER", "30"))  # seconds clients wait while the first snapshot trains
+LEASE_SECONDS = 15 * 60  # upper bound on a refresh; another process may take over after this
+TRAINING_LEASE = "forecast-training"  # held by whoever fits Prophet models, in any process
+
+_refresh_lock = threading.Lock()
+_refresher = None
+
+
+def latest_snapshot():
+    return db.forecast_snapshots.find_one({}, sort=[("createdAt", DESCENDING)])
+
+
+class LeaseBusy(RuntimeError):
+    pass
+
+
+def refresh_snapshot(wait=0):
+    # Trains only while holding the training lease; with wait=0 a refresh already running in
+    # another process makes this one a no-op that returns the latest snapshot
+    with _refresh_lock:
+        try:
+            with training_lease(wait=wait):
+                return _refresh()
+        except LeaseBusy:
+            print("⏳ Another process is training; skipping this snapshot refresh")
+            return latest_snapshot()
+
+
+def get_snapshot():
+    # Readers never train: with no snapshot yet, start a background refresh and return None
+    doc = latest_snapshot()
+    if doc is None:
+        trigger_refresh()
+    return doc
+
+
+def _refresh():
+    # Train once for the whole horizon; weekly and ingredient views share the same fit.
+    # The forecasting stack (pandas, Prophet) is imported here, not when the service starts.
+    from forecast import get_forecast
+    from ingredient_forecast import build_ingredient_forecast, save_to_db
+
+    started = time.monotonic()
+    weeks = get_forecast(horizon_weeks=HORIZON_WEEKS)
+    usage, fingerprint = build_ingredient_forecast(weekly_forecasts=weeks)
+    save_to_db(usage, fingerprint=fingerprint, weeks=HORIZON_WEEKS)
+
+    doc = {
+        "createdAt": datetime.now(timezone.utc),
+        "durationSeconds": round(time.monotonic() - started, 2),
+        "weekly": weeks,
+        "ingredients": usage,
+    }
+    db.forecast_snapshots.insert_one(doc)
+
+    old = db.forecast_snapshots.find({}, {"_id": 1}).sort("createdAt", DESCENDING).skip(KEEP_SNAPSHOTS)
+    old_ids = [d["_id"] for d in old]
+    if old_ids:
+        db.forecast_snapshots.delete_many({"_id": {"$in": old_ids}})
+
+    print(f"📸 Forecast snapshot refreshed in {doc['durationSeconds']}s")
+    return doc
+
+
+def trigger_refresh():
+    # Recompute in the background; False if a refresh is already running
+    if _refresh_lock.locked():
+        return False
+    threading.Thread(target=_safe_refresh, name="forecast-refresh", daemon=True).start()
+    return True
+
+
+def snapshot_meta(doc):
+    if doc is None:
+        return {"generatedAt": None, "ageSeconds": None, "stale": True, "refreshing": is_refreshing()}
+    created = doc["createdAt"]
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)
+    age = (datetime.now(timezone.utc) - created).total_seconds()
+    return {
+        "generatedAt": created.isoformat(),
+        "ageSeconds": int(age),
+        "stale": age > MAX_AGE,
+        "refreshing": is_refreshing(),
+        "durationSeconds": doc.get("durationSeconds"),
+    }
+
+
+def is_refreshing():
+    return _refresh_lock.locked()
+
+
+def acquire_lease(seconds=LEASE_SECONDS, name=TRAINING_LEASE):
+    # Only one process (WSGI worker, cron run) holds a given lease at a time
+    now = datetime.now(timezone.utc)
+    try:
+        db.forecast_locks.find_one_and_update(
+            {"_id": name, "until": {"$lt": now}},
+            {"$set": {"until": now + timedelta(seconds=seconds), "owner": f"{socket.gethostname()}:{os.getpid()}"}},
+            upsert=True,
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+def release_lease(name=TRAINING_LEASE):
+    db.forecast_locks.delete_one({"_id": name, "owner": f"{socket.gethostname()}:{os.getpid()}"})
+
+
+@contextmanager
+def training_lease(name=TRAINING_LEASE, wait=0, seconds=LEASE_SECONDS):
+    # Hold `name` for the block, polling up to `wait` seconds for it; LeaseBusy if it stays taken
+    deadline = time.monotonic() + wait
+    while not acquire_lease(seconds, name):
+        if time.monotonic() >= deadline:
+            raise LeaseBusy(f"lease {name!r} is held by another process")
+        time.sleep(2)
+    try:
+        yield
+    finally:
+        release_lease(name)
+
+
+def start_refresher(interval=REFRESH_INTERVAL):
+    # Background loop that refreshes whenever the latest snapshot is older than `interval`.
+    # Safe to start in every worker: refresh_snapshot() trains only under the Mongo lease.
+    global _refresher
+    if interval <= 0 or (_refresher is not None and _refresher.is_alive()):
+        return _refresher
+
+    def loop():
+        while True:
+            try:
+                age = snapshot_meta(latest_snapshot())["ageSeconds"]
+                if age is None or age >= interval:
+                    _safe_refresh()
+            except Exception as e:
+                print("❌ Forecast refresher error:", e)
+            time.sleep(min(interval, 60))
+
+    _refresher = threading.Thread(target=loop, name="forecast-refresher", daemon=True)
+    _refresher.start()
+    return _refresher
+
+
+def _safe_refresh():
+    try:
+        refresh_snapshot()
+    except Exception as e:
+        print("❌ Forecast snapshot refresh failed:", e)
+
+
+if __name__ == "__main__":
+    # One-shot refresh for cron; `python snapshots.py --loop` keeps refreshing every REFRESH_INTERVAL
+    if "--loop" in sys.argv:
+        start_refresher(REFRESH_INTERVAL or 3600).join()
+    else:
+        refresh_snapshot()
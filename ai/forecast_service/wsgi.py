@@ -0,0 +1,18 @@
+# ai/forecast_service/wsgi.py
+# Production entry point:  gunicorn -c gunicorn.conf.py wsgi:app
+import os
+
+import indexes
+from app import create_app
+
+# The app itself imports only the light recommendation path. A worker that also trains
+# forecasts preloads the Prophet stack once in the gunicorn master (preload_app), so
+# workers share it copy-on-write; FORECAST_PRELOAD=0 skips that (recommendations-only).
+if os.getenv("FORECAST_PRELOAD", "1") == "1":
+    import prophet  # noqa: F401
+    import forecast  # noqa: F401
+    import ingredient_forecast  # noqa: F401
+
+if indexes.ENSURE_ON_STARTUP:
+    indexes.bootstrap()  # once, in the master; FORECAST_INDEX_STRICT=1 aborts startup on a COLLSCAN
+app = create_app()
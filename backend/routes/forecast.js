@@ -16,11 +16,26 @@ router.post("/aggregate-weekly", async (req, res) => {
   }
 });
 
+// The first forecast is still training: pass the service's 503 + Retry-After through
+function forwardPending(err, res) {
+  if (err.response?.status !== 503) return false;
+  const retryAfter = err.response.headers["retry-after"];
+  if (retryAfter) res.set("Retry-After", retryAfter);
+  res.status(503).json(err.response.data);
+  return true;
+}
+
 router.get("/weekly", async (req, res) => {
-  const weeks = req.query.weeks || 1;
-  const { data } = await forecastClient.get("/forecast/weekly", { params: { weeks } });
+  try {
+    const weeks = req.query.weeks || 1;
+    const { data } = await forecastClient.get("/forecast/weekly", { params: { weeks } });
 
-  res.json(data);
+    res.json(data);
+  } catch (err) {
+    if (forwardPending(err, res)) return;
+    console.error("Error fetching weekly forecast:", err.message);
+    res.status(500).json({ error: "Failed to fetch weekly forecast" });
+  }
 });
 
 // GET /api/admin/forecast/ingredients
@@ -31,17 +46,54 @@ router.get("/ingredients", async (req, res) => {
 
     res.json(data);
   } catch (err) {
+    if (forwardPending(err, res)) return;
     console.error("Error fetching ingredient forecast:", err.message);
     res.status(500).json({ error: "Failed to fetch ingredient forecast" });
   }
 });
 
+// GET /api/admin/forecast/status -> age/staleness of the latest forecast snapshot
+router.get("/status", async (req, res) => {
+  try {
+    const { data } = await forecastClient.get("/forecast/status");
+    res.json(data);
+  } catch (err) {
+    console.error("Error fetching forecast status:", err.message);
+    res.status(500).json({ error: "Failed to fetch forecast status" });
+  }
+});
+
+// GET /api/admin/forecast/recommendations/cache -> per-user recommendation cache hit/miss counters
+router.get("/recommendations/cache", async (req, res) => {
+  try {
+    const { data } = await forecastClient.get("/forecast/recommendations/cache");
+    res.json(data);
+  } catch (err) {
+    console.error("Error fetching recommendation cache stats:", err.message);
+    res.status(500).json({ error: "Failed to fetch recommendation cache stats" });
+  }
+});
+
+// POST /api/admin/forecast/refresh -> recompute the forecast snapshot in the background
+router.post("/refresh", async (req, res) => {
+  // this router is also mounted under /api/ai, which is not admin-guarded
+  if (req.user?.email !== process.env.ADMIN) return res.sendStatus(401);
+  try {
+    const { data } = await forecastClient.post("/forecast/refresh");
+    res.status(202).json(data);
+  } catch (err) {
+    console.error("Error triggering forecast refresh:", err.message);
+    res.status(500).json({ error: "Failed to trigger forecast refresh" });
+  }
+});
+
 // backend/routes/admin/forecast.js  (or wherever you keep admin api)
 router.get("/recommendations", async (req, res) => {
   try {
     console.log("recommendations Email" + req.user.email)
     const email = req.user.email;
-    const { data } = await forecastClient.get(`/forecast/recommendations`, { params: { email } });
+    const { weeks, halfLife } = req.query;  // optional lookback window / decay half-life in weeks
+    const { data } = await forecastClient.get(`/forecast/recommendations`, { params: { email, weeks, halfLife } });
     res.json(data);
   } catch (err) {
     console.error("Error fetching recommendations:", err.message);
@@ -49,4 +101,20 @@ router.get("/recommendations", async (req, res) => {
   }
 });
 
+// POST /api/admin/forecast/recommendations/batch  { emails: [...] } | { all: true }
+// Streams JSON lines from the forecast service: popular dishes first, then one line per user
+router.post("/recommendations/batch", async (req, res) => {
+  if (req.user?.email !== process.env.ADMIN) return res.sendStatus(401);
+  try {
+    const upstream = await forecastClient.post("/forecast/recommendations/batch", req.body, {
+      responseType: "stream",
+    });
+    res.setHeader("Content-Type", "application/x-ndjson");
+    upstream.data.pipe(res);
+  } catch (err) {
+    console.error("Error fetching batch recommendations:", err.message);
+    res.status(500).json({ error: "Failed to fetch batch recommendations" });
+  }
+});
+
 module.exports = router;
@@ -10,6 +10,13 @@ const Order = require("../models/Order");
 
 const Rating = require("../models/Rating");
 const { Menu } = require("../models/Menu");
+const forecastClient = require("../utils/forecastClient");
+
+// Drop the user's cached recommendations; the forecast service being down must not fail the request
+const invalidateRecommendations = (email) =>
+  forecastClient
+    .post("/forecast/recommendations/invalidate", { email })
+    .catch((err) => console.error("Recommendation cache invalidation failed:", err.message));
 
 
 // Import RazorPay payment validator
@@ -71,6 +78,7 @@ router.post("/createOrder", async (req, res) => {
 
     // Update buyer
     await Buyer.saveOrder(req.user.email, order.selected);
+    invalidateRecommendations(req.user.email);
 
     res.status(201).json({
       message: "Order created successfully",
@@ -143,6 +151,7 @@ router.post("/rateMeal", async (req, res) => {
     });
 
     await updated.save();
+    invalidateRecommendations(email);
 
     return res.json({ success: true });
   } catch (err) {